@@ -12,6 +12,41 @@ class TestOneBasedList(TestCase):
         for i in range(1, 11):
             self.assertEquals(one_based[i], regular[i - 1])
 
+    def test_out_of_range(self):
+        one_based = OneBasedList(range(10))
+        self.assertRaisesRegex(Exception, "Index out of range: 0", lambda: one_based[0])
+        self.assertRaisesRegex(Exception, "Index out of range: 11", lambda: one_based[11])
+
+
+class TestFastOneBasedList(TestCase):
+    def test_indexes(self):
+        one_based = FastOneBasedList(range(10))
+        regular = range(10)
+
+        # Make sure everything is one off
+        self.assertEqual(len(one_based), 10)
+        for i in range(1, 11):
+            self.assertEqual(one_based[i], regular[i - 1])
+
+        one_based[10] = 42
+        self.assertEqual(one_based[10], 42)
+        self.assertEqual(str(one_based), str([0, 1, 2, 3, 4, 5, 6, 7, 8, 42]))
+
+    def test_auto_append(self):
+        one_based = FastOneBasedList([1], auto_append=True)
+        one_based[2] = 2
+        self.assertEqual(len(one_based), 2)
+        self.assertRaises(IndexError, one_based.__setitem__, 4, 4)
+
+        one_based = FastOneBasedList([1])
+        self.assertRaises(IndexError, one_based.__setitem__, 2, 2)
+
+    def test_debug(self):
+        one_based = FastOneBasedList(range(10), debug=True)
+        self.assertRaisesRegex(IndexError, "Index out of range: 0", lambda: one_based[0])
+        self.assertRaisesRegex(IndexError, "Index out of range: 11", lambda: one_based[11])
+        self.assertRaises(IndexError, one_based.__setitem__, 0, 1)
+
 
 class TestStack(TestCase):
     def test_stack_empty(self):
@@ -1,5 +1,7 @@
+import random
 from unittest import TestCase
 
+from data_structures import OneBasedList
 from dynamic_programming import *
 
 
@@ -27,6 +29,29 @@ class TestFastestWay(TestCase):
         # line 2, station 2
         # line 1, station 1
         # print_stations(l, l_star, n)
+        self.assertEqual(f_star, 38)
+        self.assertEqual(l_star, 1)
+
+    def test_k_lines(self):
+        a = [[7, 9, 3, 4, 8, 4], [8, 5, 6, 4, 5, 7]]
+        t = [[2, 3, 1, 3, 4], [2, 1, 2, 2, 1]]
+        e = [2, 4]
+        x = [3, 2]
+
+        f_star, l_star, l = fastest_way_k_lines(a, t, e, x)
+        self.assertEqual(f_star, 38)
+        self.assertEqual(l_star, 0)
+        self.assertEqual(l.dtype, numpy.int8)
+        self.assertListEqual(fastest_way_route(l, l_star), [0, 1, 0, 1, 1, 0])
+        self.assertEqual(fastest_way_k_lines(a, t, e, x, path=False), (38, 0, None))
+
+        # A third line that is fast but expensive to transfer to
+        a.append([1, 1, 1, 1, 1, 1])
+        t = numpy.full((3, 3, 5), 1)
+        t[:, 2, :] = 100
+        f_star, l_star, l = fastest_way_k_lines(a, t, [2, 4, 20], [3, 2, 0])
+        self.assertEqual(f_star, 26)
+        self.assertListEqual(fastest_way_route(l, l_star), [2, 2, 2, 2, 2, 2])
 
 
 class MatrixMultiplication(TestCase):
@@ -37,6 +62,31 @@ class MatrixMultiplication(TestCase):
         output = matrix_multiply(m, n)
         self.assertTrue((output == numpy.matrix('58 64; 139 154')).all())
 
+        # Object matrices use the blocked kernel
+        output = matrix_multiply(m.astype(object), n.astype(object), block_size=1)
+        self.assertEqual(output.dtype, object)
+        self.assertTrue((output == numpy.matrix('58 64; 139 154')).all())
+
+        self.assertRaises(Exception, matrix_multiply, m, m)
+
+        # Booleans sum their products rather than being and/or'd together
+        output = matrix_multiply(numpy.matrix([[True, True]]), numpy.matrix([[True], [True]]))
+        self.assertTrue((output == numpy.matrix([[2]])).all())
+
+    def test_strassen_matrix_multiply(self):
+        a = numpy.matrix(numpy.arange(49).reshape(7, 7) - 20)
+        b = numpy.matrix(numpy.arange(49).reshape(7, 7) % 5)
+        expected = matrix_multiply(a, b)
+
+        self.assertTrue((strassen_matrix_multiply(a, b, leaf_size=2) == expected).all())
+        self.assertTrue((strassen_matrix_multiply(a.astype(object), b.astype(object), leaf_size=2) == expected).all())
+
+        a, b = a % 2 == 0, b % 2 == 0
+        expected = matrix_multiply(a, b)
+        self.assertTrue((expected == matrix_multiply(a.astype(int), b.astype(int))).all())
+        self.assertTrue((strassen_matrix_multiply(a, b, leaf_size=2) == expected).all())
+        self.assertRaises(Exception, strassen_matrix_multiply, numpy.matrix('1 2 3; 4 5 6'), numpy.matrix('1 2; 3 4'))
+
     def test_matrix_chain_order(self):
         p = [
             numpy.matrix([[0] * 35] * 30),
@@ -60,6 +110,108 @@ class MatrixMultiplication(TestCase):
         self.assertEqual(recursive_solution, 15125)
         self.assertEqual(memoized_solution, 15125)
 
+        table = numpy.full((len(p), len(p)), -1, dtype=numpy.int64)
+        lookup_solution = lookup_chain(dims, 0, len(p) - 1, table)
+        self.assertEqual(lookup_solution, 15125)
+        self.assertIsInstance(lookup_solution, int)
+        self.assertEqual(table[0, len(p) - 1], 15125)
+        self.assertEqual(lookup_chain(dims, 1, 4, table), m[1, 4])
+
+    def test_matrix_chain_order_random(self):
+        def book_matrix_chain_order(p):
+            n = len(p) - 1
+            m = [[0] * n for _ in range(n)]
+            s = [[0] * n for _ in range(n)]
+            for l in range(1, n):
+                for i in range(n - l):
+                    j = i + l
+                    m[i][j] = None
+                    for k in range(i, j):
+                        q = m[i][k] + m[k + 1][j] + p[i] * p[k + 1] * p[j + 1]
+                        if m[i][j] is None or q < m[i][j]:
+                            m[i][j] = q
+                            s[i][j] = k
+            return m, s
+
+        # Small dimensions make ties common, the first split achieving the minimum should be kept
+        for _ in range(50):
+            p = [random.randint(1, 6) for _ in range(random.randint(2, 15))]
+            m, s = matrix_chain_order(p)
+            expected_m, expected_s = book_matrix_chain_order(p)
+            self.assertListEqual(m.tolist(), expected_m)
+            self.assertListEqual(s.tolist(), expected_s)
+
+    def test_parallel_matrix_chain_order(self):
+        dims = [30, 35, 15, 5, 10, 20, 25]
+        m, s = parallel_matrix_chain_order(dims, processes=2, minimum_cells=1)
+        self.assertEqual(m[0, len(dims) - 2], 15125)
+        self.assertEqual(print_optimal_parens(s, 0, len(dims) - 2), "((A(AA))((AA)A))")
+
+        random.seed(7)
+        dims = [random.randint(1, 50) for i in range(60)]
+        m, s = parallel_matrix_chain_order(dims, processes=2, minimum_cells=100)
+        expected_m, expected_s = matrix_chain_order(dims)
+        self.assertTrue((m == expected_m).all())
+        self.assertTrue((s == expected_s).all())
+
+        # Small chains and a single process don't need the pool
+        m, s = parallel_matrix_chain_order(dims, processes=1)
+        self.assertTrue((m == expected_m).all())
+        m, s = parallel_matrix_chain_order(dims, processes=2)
+        self.assertTrue((s == expected_s).all())
+
+    def test_approximate_matrix_chain_order(self):
+        dims = [30, 35, 15, 5, 10, 20, 25]
+        cost, s = approximate_matrix_chain_order(dims)
+        self.assertEqual(cost, 15125)
+        self.assertEqual(print_optimal_parens(s, 0, len(dims) - 2), "((A(AA))((AA)A))")
+
+        random.seed(7)
+        for trial in range(50):
+            dims = [random.randint(1, 100) for i in range(random.randint(3, 30))]
+            cost, s = approximate_matrix_chain_order(dims)
+            optimal = matrix_chain_order(dims)[0][0, len(dims) - 2]
+            self.assertGreaterEqual(cost, optimal)
+            self.assertLessEqual(cost, optimal * 1.155)
+            self.assertEqual(len(print_optimal_parens(s, 0, len(dims) - 2)), 3 * (len(dims) - 1) - 2)
+
+    def test_plan_matrix_chain_order(self):
+        dims = [30, 35, 15, 5, 10, 20, 25]
+        cost, s = plan_matrix_chain_order(dims, processes=1)
+        self.assertEqual(cost, 15125)
+        self.assertEqual(print_optimal_parens(s, 0, len(dims) - 2), "((A(AA))((AA)A))")
+
+        # Longer chains than the threshold only use the approximation when asked to
+        random.seed(7)
+        dims = [random.randint(1, 100) for i in range(30)]
+        self.assertEqual(plan_matrix_chain_order(dims, threshold=10, approximate=True),
+                         approximate_matrix_chain_order(dims))
+        self.assertEqual(plan_matrix_chain_order(dims, threshold=10, processes=1)[0],
+                         matrix_chain_order(dims)[0][0, len(dims) - 2])
+        self.assertEqual(plan_matrix_chain_order(dims, processes=1)[0], matrix_chain_order(dims)[0][0, len(dims) - 2])
+
+    def test_matrix_chain_multiply(self):
+        shapes = [(30, 35), (35, 15), (15, 5), (5, 10), (10, 20), (20, 25)]
+        p = [numpy.matrix(numpy.arange(r * c).reshape(r, c) % 7) for r, c in shapes]
+
+        expected = p[0]
+        for matrix in p[1:]:
+            expected = expected * matrix
+
+        self.assertTrue((matrix_chain_multiply(p) == expected).all())
+
+        # The second chain of the same shapes reuses the cached plan
+        hits = matrix_chain_plan.cache_info().hits
+        self.assertTrue((matrix_chain_multiply(p) == expected).all())
+        self.assertEqual(matrix_chain_plan.cache_info().hits, hits + 1)
+
+        # The cached plan is shared, so it can't be modified
+        s = matrix_chain_plan(tuple([x.shape[0] for x in p] + [p[-1].shape[1]]))
+        self.assertFalse(s.flags.writeable)
+        self.assertRaises(ValueError, s.__setitem__, (0, 1), 0)
+
+        self.assertRaises(Exception, matrix_chain_multiply, [p[0], p[2]])
+
 
 class LCS(TestCase):
     def test_lcs_length(self):
@@ -87,3 +239,223 @@ class LCS(TestCase):
         self.assertEqual(b[7], [None, "up_left", "up", "up", "up", "up_left", "up"])
 
         self.assertEqual(print_lcs(b, x), "BCBA")
+
+    def test_lcs_linear_space(self):
+        x = ['A', 'B', 'C', 'B', 'D', 'A', 'B']
+        y = ['B', 'D', 'C', 'A', 'B', 'A']
+        self.assertEqual(lcs_length_rolling(x, y), 4)
+        self.assertEqual(lcs_length_rolling(y, x), 4)
+        self.assertEqual(hirschberg_lcs(x, y), ['B', 'D', 'A', 'B'])
+        self.assertEqual(hirschberg_lcs("", "ABC"), [])
+
+        # Compare against the full tables on random sequences
+        random.seed(5)
+        for trial in range(50):
+            x = [random.choice("ACGT") for i in range(random.randint(0, 30))]
+            y = [random.choice("ACGT") for i in range(random.randint(0, 30))]
+            c, b = lcs_length(x, y)
+            subsequence = hirschberg_lcs(x, y)
+
+            self.assertEqual(lcs_length_rolling(x, y), c[len(x)][len(y)])
+            self.assertEqual(len(subsequence), c[len(x)][len(y)])
+            self.assertEqual(lcs_length_rolling(subsequence, x), len(subsequence))
+            self.assertEqual(lcs_length_rolling(subsequence, y), len(subsequence))
+
+    def test_bit_parallel_lcs_length(self):
+        x = ['A', 'B', 'C', 'B', 'D', 'A', 'B']
+        y = ['B', 'D', 'C', 'A', 'B', 'A']
+        self.assertEqual(bit_parallel_lcs_length(x, y), 4)
+        self.assertEqual(bit_parallel_lcs_length("", "ABC"), 0)
+        self.assertEqual(bit_parallel_lcs_length("ABC", "XYZ"), 0)
+
+        random.seed(6)
+        for trial in range(50):
+            x = [random.choice("ACGT") for i in range(random.randint(0, 100))]
+            y = [random.choice("ACGTN") for i in range(random.randint(0, 100))]
+            self.assertEqual(bit_parallel_lcs_length(x, y, lcs_match_masks(x)), lcs_length_rolling(x, y))
+
+    def test_lcs_sequence(self):
+        x = ['A', 'B', 'C', 'B', 'D', 'A', 'B']
+        y = ['B', 'D', 'C', 'A', 'B', 'A']
+        c, b = lcs_length(x, y)
+        self.assertEqual(lcs_sequence(b, x), ['B', 'C', 'B', 'A'])
+        self.assertEqual(list(lcs_alignment(b)), [(1, 0), (2, 2), (3, 4), (5, 5)])
+
+        c, b = lcs_length("ABCBDAB", "BDCABA")
+        self.assertEqual(lcs_sequence(b, "ABCBDAB"), "BCBA")
+
+        c, b = lcs_length(b"ABCBDAB", b"BDCABA")
+        self.assertEqual(lcs_sequence(b, b"ABCBDAB"), b"BCBA")
+
+        c, b = lcs_length(tuple(x), tuple(y))
+        self.assertEqual(lcs_sequence(b, tuple(x)), ('B', 'C', 'B', 'A'))
+
+        # Longer than the recursion limit allows
+        x = "AB" * 600
+        c, b = lcs_length(x, x)
+        self.assertEqual(print_lcs(b, x), x)
+
+    def test_myers_diff(self):
+        self.assertEqual(myers_diff("ABCABBA", "CBABAC"), [
+            ("delete", 0, 2, 0, 0),
+            ("equal", 2, 3, 0, 1),
+            ("delete", 3, 4, 1, 1),
+            ("equal", 4, 5, 1, 2),
+            ("insert", 5, 5, 2, 3),
+            ("equal", 5, 7, 3, 5),
+            ("insert", 7, 7, 5, 6)
+        ])
+        self.assertEqual(myers_diff("", ""), [])
+        self.assertEqual(myers_diff("ABC", "ABC"), [("equal", 0, 3, 0, 3)])
+
+        # The hunks should rebuild the new sequence and the equal hunks should be a longest common subsequence
+        random.seed(8)
+        for trial in range(100):
+            x = [random.choice("ABC") for i in range(random.randint(0, 20))]
+            y = [random.choice("ABC") for i in range(random.randint(0, 20))]
+            output = []
+            common = 0
+            for tag, i1, i2, j1, j2 in myers_diff(x, y):
+                if tag == "equal":
+                    self.assertEqual(x[i1:i2], y[j1:j2])
+                    output += x[i1:i2]
+                    common += i2 - i1
+                elif tag == "insert":
+                    output += y[j1:j2]
+
+            self.assertEqual(output, y)
+            self.assertEqual(common, lcs_length_rolling(x, y))
+
+    def test_batch_lcs(self):
+        query = "ABCBDAB"
+        targets = ["BDCABA", "XYZ", "", "ABCBDAB", "BBBB"]
+        expected = [lcs_length_rolling(query, target) for target in targets]
+
+        self.assertEqual(batch_lcs(query, targets, processes=1), expected)
+        self.assertEqual(batch_lcs(query, targets, processes=2, chunk_size=2), expected)
+
+        output = batch_lcs(query, targets, processes=2, alignments=True)
+        for target, (length, alignment) in zip(targets, output):
+            self.assertEqual(length, len(alignment))
+            for i, j in alignment:
+                self.assertEqual(query[i], target[j])
+
+
+class Memoization(TestCase):
+    def test_memoize(self):
+        calls = []
+
+        @memoize()
+        def square(x):
+            calls.append(x)
+            return x * x
+
+        self.assertEqual(square(3), 9)
+        self.assertEqual(square(3), 9)
+        self.assertEqual(calls, [3])
+        self.assertEqual((square.hits, square.misses), (1, 1))
+
+        square.cache_clear()
+        self.assertEqual(square(3), 9)
+        self.assertEqual(calls, [3, 3])
+
+    def test_lru_eviction(self):
+        @memoize(maxsize=2)
+        def identity(x):
+            return x
+
+        identity(1)
+        identity(2)
+        identity(1)
+        identity(3)
+        self.assertEqual(list(identity.cache.keys()), [(1,), (3,)])
+
+    def test_explicit_stack(self):
+        @memoize()
+        def fib(n):
+            if n < 2:
+                return n
+            return (yield n - 1) + (yield n - 2)
+
+        # Far deeper than the recursion limit
+        self.assertEqual(fib(5000) % 1000, 125)
+        self.assertEqual(fib.misses, 5001)
+
+    def test_memoized_matrix_chain(self):
+        p = [numpy.matrix([[0] * c] * r) for r, c in [(30, 35), (35, 15), (15, 5), (5, 10), (10, 20), (20, 25)]]
+        self.assertEqual(memoized_matrix_chain(p), 15125)
+        self.assertEqual(memoized_matrix_chain(p, maxsize=4), 15125)
+
+
+class EditDistance(TestCase):
+    def test_edit_distance(self):
+        c, b = edit_distance("kitten", "sitting")
+        self.assertEqual(c[6][7], 3)
+        self.assertEqual([operation for operation in edit_operations(b, "kitten", "sitting") if operation[0] != "equal"],
+                         [("substitute", 0, 0), ("substitute", 4, 4), ("insert", 6, 6)])
+
+    def test_edit_distance_value(self):
+        self.assertEqual(edit_distance_value("kitten", "sitting"), 3)
+        self.assertEqual(edit_distance_value("kitten", "sitting", cutoff=3), 3)
+        self.assertIsNone(edit_distance_value("kitten", "sitting", cutoff=2))
+        self.assertEqual(edit_distance_value("", "abc"), 3)
+
+        random.seed(9)
+        for trial in range(50):
+            x = [random.choice("ABC") for i in range(random.randint(0, 15))]
+            y = [random.choice("ABC") for i in range(random.randint(0, 15))]
+            c, b = edit_distance(x, y)
+            distance = c[len(x)][len(y)]
+            self.assertEqual(edit_distance_value(x, y), distance)
+            self.assertEqual(edit_distance_value(x, y, cutoff=distance), distance)
+            if distance > 0:
+                self.assertIsNone(edit_distance_value(x, y, cutoff=distance - 1))
+
+
+class LongestIncreasingSubsequence(TestCase):
+    def test_longest_increasing_subsequence(self):
+        collection = [3, 1, 4, 1, 5, 9, 2, 6, 5, 3, 5, 8, 9, 7, 9]
+        subsequence = longest_increasing_subsequence(collection)
+        self.assertEqual(len(subsequence), 6)
+        self.assertEqual(subsequence, sorted(set(subsequence)))
+        self.assertEqual(longest_increasing_subsequence_length(iter(collection)), 6)
+        self.assertEqual(longest_increasing_subsequence([]), [])
+
+
+class Knapsack(TestCase):
+    def test_knapsack(self):
+        values = [60, 100, 120]
+        weights = [10, 20, 30]
+        self.assertEqual(knapsack(values, weights, 50), (220, [1, 2]))
+        self.assertEqual(knapsack_value(values, weights, 50), 220)
+        self.assertEqual(knapsack(values, weights, 5), (0, []))
+
+        # Float values aren't truncated
+        self.assertEqual(knapsack([1.5, 1.5], [1, 1], 2), (3.0, [0, 1]))
+        self.assertEqual(knapsack_value([1.5, 1.5], [1, 1], 2), 3.0)
+        self.assertEqual(knapsack([1.5, 2.25], [1, 1], 1), (2.25, [1]))
+
+
+class OptimalBinarySearchTree(TestCase):
+    def test_optimal_bst(self):
+        # Figure 15.9 of the book
+        p = [0.15, 0.10, 0.05, 0.10, 0.20]
+        q = [0.05, 0.10, 0.05, 0.05, 0.05, 0.10]
+        e, root = optimal_bst(p, q)
+        self.assertAlmostEqual(e[1][5], 2.75)
+        self.assertEqual(root[1][5], 2)
+
+        tree = build_optimal_bst([1, 2, 3, 4, 5], root)
+        self.assertEqual(tree.root.key, 2)
+        self.assertEqual(tree.root.left.key, 1)
+        self.assertEqual(tree.root.right.key, 5)
+        self.assertEqual(tree.root.right.left.key, 4)
+        self.assertEqual(tree.root.right.left.left.key, 3)
+        self.assertEqual(tree.root.right.left.left.p, tree.root.right.left)
+        self.assertEqual(tree.tree_search(tree.root, 3).key, 3)
+
+    def test_hot_key_at_root(self):
+        e, root = optimal_bst([1, 1, 1000, 1, 1])
+        tree = build_optimal_bst(["a", "b", "c", "d", "e"], root)
+        self.assertEqual(tree.root.key, "c")
+        self.assertIsNone(build_optimal_bst([], optimal_bst([])[1]).root)
@@ -1,3 +1,7 @@
+import array
+import os
+import random
+import tempfile
 from unittest import TestCase
 
 from selection import *
@@ -16,6 +20,27 @@ class TestSelection(TestCase):
         collection = [6, 7, 4, 3, 6, 8, 98, 3, 32, 6, 7, 4, 5, 1]
         self.assertEquals(minimum_maximum(collection), (1, 98))
 
+    def test_minimum_maximum_buffers(self):
+        collection = array.array('d', [6, 7, 4, 3, 6, 8, 98, 3, 32, 6, 7, 4, 5, 1])
+        self.assertEqual(minimum(collection), 1)
+        self.assertEqual(maximum(collection), 98)
+        self.assertEqual(minimum_maximum(collection), (1, 98))
+        self.assertEqual(minimum_maximum(numpy.array(collection)), (1, 98))
+
+    def test_minimum_maximum_non_numeric_buffers(self):
+        collection = numpy.array(["b", "a", "c"])
+        self.assertEqual(minimum(collection), "a")
+        self.assertEqual(maximum(collection), "c")
+        self.assertEqual(minimum_maximum(collection), ("a", "c"))
+        self.assertEqual(minimum_maximum(array.array('u', 'bac')), ("a", "c"))
+
+    def test_minimum_maximum_chunked(self):
+        collection = [6, 7, 4, 3, 6, 8, 98, 3, 32, 6, 7, 4, 5, 1]
+        self.assertEqual(minimum((x for x in collection), chunk_size=3), 1)
+        self.assertEqual(maximum((x for x in collection), chunk_size=3), 98)
+        self.assertEqual(minimum_maximum((x for x in collection), chunk_size=3), (1, 98))
+        self.assertEqual(minimum_maximum(iter(collection), chunk_size=4), (1, 98))
+
     def test_randomized_select(self):
         collection = [6, 4, 8, 98, 3, 32, 7, 5, 1]
         # Test explicit min
@@ -29,3 +54,90 @@ class TestSelection(TestCase):
         for entry in sorted(collection):
             self.assertEquals(randomized_select(collection, 0, len(collection) - 1, i), entry)
             i += 1
+
+    def test_iterative_randomized_select(self):
+        collection = [6, 4, 8, 98, 3, 32, 7, 5, 1]
+        i = 1
+        for entry in sorted(collection):
+            self.assertEqual(iterative_randomized_select(collection, 0, len(collection) - 1, i), entry)
+            i += 1
+
+        # Many duplicates should land in a single equal band
+        collection = [5, 1, 5, 5, 3, 5, 5, 9, 5, 5, 1, 5]
+        i = 1
+        for entry in sorted(collection):
+            self.assertEqual(iterative_randomized_select(collection, 0, len(collection) - 1, i), entry)
+            i += 1
+
+    def test_multi_select(self):
+        collection = [6, 4, 8, 98, 3, 32, 7, 5, 1, 5, 5, 12]
+        expected = sorted(collection)
+        ranks = [6, 1, 12, 9, 6, 3]
+        self.assertEqual(multi_select(collection, ranks), [expected[i - 1] for i in ranks])
+        self.assertEqual(multi_select(collection, range(1, len(collection) + 1)), expected)
+
+
+class TestKLLSketch(TestCase):
+    def test_quantile(self):
+        sketch = KLLSketch(k=100)
+        values = list(range(10000))
+        random.shuffle(values)
+        for x in values:
+            sketch.update(x)
+
+        self.assertEqual(len(sketch), 10000)
+        self.assertLess(sketch.size, 400)
+        for q in [0.1, 0.5, 0.9, 0.99]:
+            self.assertAlmostEqual(sketch.quantile(q), q * 10000, delta=500)
+
+    def test_merge(self):
+        first = KLLSketch(k=100)
+        second = KLLSketch(k=100)
+        for x in range(5000):
+            first.update(x)
+            second.update(x + 5000)
+
+        # Merge through the serialized form as a separate worker would.
+        merged = KLLSketch.deserialize(first.serialize())
+        merged.merge(KLLSketch.deserialize(second.serialize()))
+
+        self.assertEqual(len(merged), 10000)
+        self.assertAlmostEqual(merged.quantile(0.5), 5000, delta=500)
+        self.assertAlmostEqual(merged.quantile(0.25), 2500, delta=500)
+
+
+class TestParallelMinimumMaximum(TestCase):
+    def test_list(self):
+        collection = [6, 7, 4, 3, 6, 8, 98, 3, 32, 6, 7, 4, 5, 1]
+        self.assertEqual(parallel_minimum_maximum(collection, processes=2, shards=3), (1, 98))
+
+    def test_memmap(self):
+        with tempfile.TemporaryDirectory() as directory:
+            filename = os.path.join(directory, "telemetry.dat")
+            collection = numpy.memmap(filename, dtype="float64", mode="w+", shape=(10000,))
+            collection[:] = numpy.arange(10000) - 5000
+            collection[1234] = 99999
+            collection.flush()
+
+            collection = numpy.memmap(filename, dtype="float64", mode="r")
+            self.assertEqual(parallel_minimum_maximum(collection, processes=2, shards=7), (-5000, 99999))
+            del collection
+
+
+class TestSlidingWindowSelect(TestCase):
+    def test_sliding_select(self):
+        collection = [6, 4, 8, 98, 3, 32, 7, 5, 1, 5, 5, 12, 3, 3]
+        for w in [1, 3, 4]:
+            for i in range(1, w + 1):
+                expected = [sorted(collection[j:j + w])[i - 1] for j in range(len(collection) - w + 1)]
+                self.assertEqual(list(sliding_select(collection, w, i)), expected)
+
+    def test_median(self):
+        window = SlidingWindowSelect(3)
+        for x in [5, 1, 9, 2]:
+            window.push(x)
+
+        self.assertEqual(len(window), 3)
+        self.assertEqual(window.median(), 2)
+        self.assertEqual(window.evict(), 1)
+        self.assertEqual(window.select(2), 9)
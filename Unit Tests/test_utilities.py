@@ -45,3 +45,112 @@ class TestRandom(TestCase):
         new_collection = permute_by_cyclic(old_collection)
         self.assertListEqual(old_collection, list(range(1, 51)))
         self.assert_notequal_contains(new_collection, old_collection)
+
+    def test_batched_randomize_in_place(self):
+        # Technically this could happen...
+        collection = list(range(1, 51))
+        batched_randomize_in_place(collection, batch_size=7)
+        self.assert_notequal_contains(collection, list(range(1, 51)))
+
+        # The same seed should produce the same shuffle
+        first = list(range(1, 51))
+        second = list(range(1, 51))
+        batched_randomize_in_place(first, 42)
+        batched_randomize_in_place(second, random.Random(42))
+        self.assertListEqual(first, second)
+
+        array = numpy.arange(50)
+        batched_randomize_in_place(array, 42)
+        self.assertListEqual(sorted(array.tolist()), list(range(50)))
+        self.assertNotEqual(array.tolist(), list(range(50)))
+
+    def test_vectorized_permute_by_sorting(self):
+        # Technically this could happen...
+        collection = list(range(1, 51))
+        self.assert_notequal_contains(vectorized_permute_by_sorting(collection), collection)
+        self.assert_notequal_contains(vectorized_permute_by_sorting(collection, key_sort=False), collection)
+        self.assertListEqual(vectorized_permute_by_sorting(collection, 7), vectorized_permute_by_sorting(collection, 7))
+
+        output = vectorized_permute_by_sorting(numpy.arange(50), 7)
+        self.assertListEqual(sorted(output.tolist()), list(range(50)))
+
+    def test_iterate_permuted(self):
+        # Technically this could happen...
+        collection = list(range(1, 51))
+        output = list(iterate_permuted(collection))
+        self.assertListEqual(collection, list(range(1, 51)))
+        self.assertEqual(len(output), len(collection))
+        self.assert_notequal_contains(output, collection)
+
+
+class TestSampling(TestCase):
+    def test_reservoir_sample(self):
+        for method in [reservoir_sample, reservoir_sample_skip]:
+            sample = method(iter(range(1000)), 10)
+            self.assertEqual(len(sample), 10)
+            self.assertEqual(len(set(sample)), 10)
+            for x in sample:
+                self.assertIn(x, range(1000))
+
+            # Streams shorter than k are returned whole
+            self.assertListEqual(method(range(3), 10), [0, 1, 2])
+            self.assertListEqual(method(range(1000), 10, 5), method(range(1000), 10, 5))
+
+    def test_weighted_sample(self):
+        stream = [("a", 1), ("b", 1), ("c", 1000000)]
+        sample = weighted_sample(stream, 2)
+        self.assertEqual(len(sample), 2)
+        self.assertIn("c", sample)
+        self.assertListEqual(weighted_sample(stream, 5, 3)[:1], ["c"])
+
+    def test_batched_reservoir_sample(self):
+        records = [(i % 3, i) for i in range(300)]
+        samples = batched_reservoir_sample(records, 5)
+        self.assertEqual(sorted(samples.keys()), [0, 1, 2])
+        for stream, sample in samples.items():
+            self.assertEqual(len(sample), 5)
+            for x in sample:
+                self.assertEqual(x % 3, stream)
+
+
+class TestParallelPermute(TestCase):
+    def test_permutation_slice(self):
+        # The slices from every worker should fit together into a permutation of range(n)
+        n = 1000
+        permutation = [None] * n
+        for worker in range(4):
+            offset, indexes = permutation_slice(n, 4, worker, 11, chunk_size=128)
+            permutation[offset:offset + len(indexes)] = indexes.tolist()
+
+        self.assertListEqual(sorted(permutation), list(range(n)))
+        self.assertNotEqual(permutation, list(range(n)))
+
+    def test_parallel_permute(self):
+        # Technically this could happen...
+        collection = list(range(1, 51))
+        output = parallel_permute(collection, workers=2, seed=3)
+        self.assertListEqual(sorted(output), collection)
+        self.assertNotEqual(output, collection)
+        self.assertListEqual(output, parallel_permute(collection, workers=2, seed=3))
+
+
+class TestLazyPermutation(TestCase):
+    def test_permutation(self):
+        for n in [1, 2, 17, 1000]:
+            permutation = LazyPermutation(n, 9)
+            output = list(permutation)
+            self.assertEqual(len(permutation), n)
+            self.assertListEqual(sorted(output), list(range(n)))
+            for i in range(n):
+                self.assertEqual(permutation.inverse(permutation[i]), i)
+
+        # Technically this could happen...
+        self.assertNotEqual(list(LazyPermutation(1000, 9)), list(range(1000)))
+        self.assertListEqual(list(LazyPermutation(1000, 9)), list(LazyPermutation(1000, 9)))
+
+    def test_huge_range(self):
+        permutation = LazyPermutation(10 ** 15, 1)
+        j = permutation[123456789]
+        self.assertLess(j, 10 ** 15)
+        self.assertEqual(permutation.inverse(j), 123456789)
+        self.assertRaises(IndexError, lambda: permutation[10 ** 15])
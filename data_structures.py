@@ -24,22 +24,23 @@ class OneBasedList:
 
     def __getitem__(self, item):
         if item < 1:
-            raise Exception("Index out of range: " + item)
+            raise Exception("Index out of range: " + str(item))
         elif item > len(self.list):
-            raise Exception("Index out of range: " + item)
+            raise Exception("Index out of range: " + str(item))
 
         return self.list[item - 1]
 
     def __setitem__(self, key, value):
+        if key < 1:
+            raise Exception("Index out of range: " + str(key))
+
         key = key - 1
-        if key < 0:
-            raise Exception("Index out of range: " + value)
-        elif key == len(self.list):
+        if key == len(self.list):
             if self.auto_append and key == len(self.list):
                 self.list.append(value)
                 return
             else:
-                raise Exception("Index out of range: " + str(value))
+                raise Exception("Index out of range: " + str(key + 1))
 
         self.list[key] = value
 
@@ -53,14 +54,64 @@ class OneBasedList:
         return str(self.list)
 
 
-class Stack(OneBasedList):
+class FastOneBasedList:
+    """
+    A list that uses a one-based index, like OneBasedList but without the cost of translating every access. The
+    backing list has an unused slot at index 0 so item i is simply list[i]. Bounds are only checked in debug mode,
+    otherwise index 0 reaches the unused slot instead of raising an exception.
+    """
+    __slots__ = ("list", "auto_append", "debug")
+
+    def __init__(self, collection=None, auto_append=False, debug=False):
+        """
+        Initializes a new instance of the FastOneBasedList class.
+        :param collection: The initial collection to wrapper.
+        :param auto_append: True if calls to __setitem__ should increase the collection's size when the index is
+                            one index greater than the length of the one based collection, false otherwise.
+        :param debug: True to check every index is in range, false otherwise.
+        """
+        self.list = [None]
+        if collection is not None:
+            self.list.extend(collection)
+        self.auto_append = auto_append
+        self.debug = debug
+
+    def __getitem__(self, item):
+        if self.debug and (item < 1 or item >= len(self.list)):
+            raise IndexError("Index out of range: " + str(item))
+
+        return self.list[item]
+
+    def __setitem__(self, key, value):
+        if self.debug and (key < 1 or key > len(self.list) or (key == len(self.list) and not self.auto_append)):
+            raise IndexError("Index out of range: " + str(key))
+
+        try:
+            self.list[key] = value
+        except IndexError:
+            if self.auto_append and key == len(self.list):
+                self.list.append(value)
+            else:
+                raise
+
+    def __len__(self):
+        return len(self.list) - 1
+
+    def __str__(self):
+        return str(self.list[1:])
+
+    def __repr__(self):
+        return str(self.list[1:])
+
+
+class Stack(FastOneBasedList):
     """
     Chapter 10: A LIFO stack. Grows dynamically if the initial collection is not large enough to hold a push.
     """
 
-    def __init__(self, collection=None):
-        OneBasedList.__init__(self, collection, True)
-        self.top = len(self.list)
+    def __init__(self, collection=None, debug=False):
+        FastOneBasedList.__init__(self, collection, True, debug)
+        self.top = len(self)
 
     def stack_empty(self):
         """
@@ -91,13 +142,13 @@ class Stack(OneBasedList):
             return self[self.top + 1]
 
 
-class Queue(OneBasedList):
+class Queue(FastOneBasedList):
     """
     Chapter 10: A FIFO queue. Does not resize to accommodate enqueues that exceed the collection's size.
     """
 
-    def __init__(self, collection):
-        OneBasedList.__init__(self, collection, False)
+    def __init__(self, collection, debug=False):
+        FastOneBasedList.__init__(self, collection, False, debug)
         self.head = 1
         self.tail = len(self) + 1
 
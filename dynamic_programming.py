@@ -1,6 +1,17 @@
+import bisect
+import collections
+import concurrent.futures
+import functools
+import inspect
+import itertools
+import math
+import os
+from multiprocessing import shared_memory
+
 import numpy
+from numpy.lib.stride_tricks import as_strided
 
-from data_structures import OneBasedList
+from data_structures import BinarySearchTree, BinaryTreePointers, FastOneBasedList
 
 
 def fastest_way(a, t, e, x, n):
@@ -26,7 +37,7 @@ def fastest_way(a, t, e, x, n):
     """
     f1 = [None] * (n + 1)
     f2 = [None] * (n + 1)
-    l = OneBasedList([OneBasedList([None] * n), OneBasedList([None] * n)])
+    l = FastOneBasedList([FastOneBasedList([None] * n), FastOneBasedList([None] * n)])
 
     f1[1] = e[1] + a[1][1]
     f2[1] = e[2] + a[2][1]
@@ -70,11 +81,92 @@ def print_stations(l, l_star, n):
         print("line " + str(i) + ", station " + str(j - 1))
 
 
-def matrix_multiply(a, b):
+def fastest_way_k_lines(a, t, e, x, path=True):
+    """
+    Chapter 15: Computes the fastest way through k assembly lines of n stations each. This is fastest_way generalized
+    to any number of lines and stored in numpy arrays, unlike fastest_way the lines and stations use a zero based index.
+    Each station is processed for all lines at once: the cost of arriving at every line from every line is a k x k
+    array and the fastest predecessor is found with a single argmin.
+
+    Only the fastest times for the previous station are needed to compute the next, so the times are kept as one row
+    of k values. The predecessor table l is stored in the smallest integer type that can hold a line number, when path
+    is false it isn't stored at all. The k x k transfer times are built one station at a time from t, so beyond the
+    inputs the memory used is O(k^2) regardless of the number of stations.
+    :param a: The amount of time spent at a station. A two dimensional array [0...k - 1][0...n - 1].
+    :param t: The amount of time to transfer between lines after a station. Either a three dimensional array
+              [from line][to line][0...n - 2] or, as in fastest_way, a two dimensional array [from line][0...n - 2] when
+              the transfer time doesn't depend on the line transferred to.
+    :param e: The entrance time for the first station of each line. A one dimensional array [0...k - 1].
+    :param x: The exit time for the last station of each line. A one dimensional array [0...k - 1].
+    :param path: True to compute the predecessor table l, false if only the fastest time and exit line are needed.
+    :return: A tuple where (fastest time through station, fastest line number to leave on, an array of fastest stations
+             or None when path is false). l[line number][station number] is the line used at station number - 1 on
+             the fastest way to station [line number][station number], see fastest_way_route.
+    """
+    a = numpy.asarray(a)
+    t = numpy.asarray(t)
+    k, n = a.shape
+
+    if k <= numpy.iinfo(numpy.int8).max:
+        dtype = numpy.int8
+    elif k <= numpy.iinfo(numpy.int16).max:
+        dtype = numpy.int16
+    else:
+        dtype = numpy.int32
+
+    l = numpy.zeros((k, n), dtype=dtype) if path else None
+    lines = numpy.arange(k)
+
+    f = numpy.asarray(e) + a[:, 0]
+    for j in range(1, n):
+        # The transfer times after station j - 1 as [from line][to line], staying on the same line is free.
+        if t.ndim == 2:
+            transfer = numpy.repeat(t[:, j - 1, numpy.newaxis], k, axis=1)
+        else:
+            transfer = t[:, :, j - 1].copy()
+        transfer[lines, lines] = 0
+
+        # arrive[from line, to line] is the time to reach station j on "to line" coming from "from line".
+        arrive = f[:, numpy.newaxis] + transfer
+        best = arrive.argmin(axis=0)
+
+        # Like fastest_way, prefer staying on the same line when it ties with the fastest transfer.
+        best = numpy.where(arrive[lines, lines] <= arrive[best, lines], lines, best)
+        f = arrive[best, lines] + a[:, j]
+
+        if path:
+            l[:, j] = best
+
+    total = f + numpy.asarray(x)
+    l_star = int(total.argmin())
+    return total[l_star].item(), l_star, l
+
+
+def fastest_way_route(l, l_star):
+    """
+    Chapter 15: Traces the fastest way through the stations using the output of fastest_way_k_lines.
+    :param l: The predecessor table from fastest_way_k_lines.
+    :param l_star: The fastest line to exit from.
+    :return: A list of the line used at each station, in station order.
+    """
+    n = l.shape[1]
+    route = [0] * n
+    i = l_star
+    for j in range(n - 1, -1, -1):
+        route[j] = i
+        i = int(l[i, j])
+
+    return route
+
+
+def matrix_multiply(a, b, block_size=64):
     """
     Chapter 15: Multiplies two matrices. Matrices are assumed to use a 1 based index.
+    Matrices of numbers are multiplied by numpy (and therefore BLAS). Anything else, such as matrices of Python objects,
+    is multiplied in blocks of block_size x block_size so that the rows being worked on stay in the cache.
     :param a: The first matrix, expected numpy.matrix.
     :param b: The second matrix, expected numpy.matrix.
+    :param block_size: The size of the blocks used when the matrices aren't numeric.
     :return: A matrix product (numpy.matrix).
     """
 
@@ -87,26 +179,107 @@ def matrix_multiply(a, b):
     if columns(a) != rows(b):
         raise Exception("incompatible dimensions")
 
-    c = numpy.matrix([[None] * columns(b)] * rows(a))
+    a = numpy.asarray(a)
+    b = numpy.asarray(b)
 
-    for i in range(0, rows(a)):
-        for j in range(0, columns(b)):
-            c[i, j] = 0
+    if numeric(a) and numeric(b):
+        return numpy.matrix(a @ b)
 
-            for k in range(0, columns(a)):
-                c[i, j] = c[i, j] + a[i, k] * b[k, j]
+    # Plain lists of rows are much faster to index than a numpy array of objects.
+    A = a.tolist()
+    B = b.tolist()
+    c = [[0] * columns(b) for i in range(rows(a))]
 
-    return c
+    for ii in range(0, rows(a), block_size):
+        for kk in range(0, columns(a), block_size):
+            for jj in range(0, columns(b), block_size):
+                for i in range(ii, min(ii + block_size, rows(a))):
+                    a_i = A[i]
+                    c_i = c[i]
+                    for k in range(kk, min(kk + block_size, columns(a))):
+                        a_ik = a_i[k]
+                        b_k = B[k]
+                        for j in range(jj, min(jj + block_size, columns(b))):
+                            c_i[j] = c_i[j] + a_ik * b_k[j]
+
+    return numpy.matrix(c, dtype=object)
+
+
+def numeric(matrix):
+    """
+    Determines if numpy can multiply the matrix natively, rather than one Python object at a time.
+    Booleans aren't numeric here, numpy would multiply them with and/or rather than summing the products.
+    :param matrix: The matrix to check.
+    :return: True if the matrix holds numbers, false otherwise.
+    """
+    return numpy.issubdtype(matrix.dtype, numpy.number)
+
+
+def strassen_matrix_multiply(a, b, leaf_size=64):
+    """
+    Chapter 4: Multiplies two square matrices using Strassen's method. Each level of recursion splits the matrices
+    into quarters and computes the product with 7 multiplications of the quarters instead of 8, giving O(n^lg 7) time.
+    Matrices that aren't a power of two in size are padded with zeros. Quarters of leaf_size or less are multiplied
+    with matrix_multiply.
+    :param a: The first matrix, expected numpy.matrix.
+    :param b: The second matrix, expected numpy.matrix.
+    :param leaf_size: The size at which to stop recursing.
+    :return: A matrix product (numpy.matrix).
+    """
+    if a.shape[1] != b.shape[0]:
+        raise Exception("incompatible dimensions")
+
+    if a.shape[0] != a.shape[1] or b.shape[0] != b.shape[1]:
+        raise Exception("Strassen's method requires square matrices")
+
+    def multiply(A, B):
+        n = A.shape[0]
+        if n <= leaf_size:
+            return numpy.asarray(matrix_multiply(A, B))
+
+        h = n // 2
+        A11, A12, A21, A22 = A[:h, :h], A[:h, h:], A[h:, :h], A[h:, h:]
+        B11, B12, B21, B22 = B[:h, :h], B[:h, h:], B[h:, :h], B[h:, h:]
+
+        P1 = multiply(A11, B12 - B22)
+        P2 = multiply(A11 + A12, B22)
+        P3 = multiply(A21 + A22, B11)
+        P4 = multiply(A22, B21 - B11)
+        P5 = multiply(A11 + A22, B11 + B22)
+        P6 = multiply(A12 - A22, B21 + B22)
+        P7 = multiply(A11 - A21, B11 + B12)
+
+        C = numpy.empty((n, n), dtype=P1.dtype)
+        C[:h, :h] = P5 + P4 - P2 + P6
+        C[:h, h:] = P1 + P2
+        C[h:, :h] = P3 + P4
+        C[h:, h:] = P5 + P1 - P3 - P7
+        return C
+
+    n = a.shape[0]
+    size = 1
+    while size < n:
+        size *= 2
+
+    # Pad with zeros up to a power of two. Booleans can't be subtracted, so they are multiplied as integers.
+    A = numpy.zeros((size, size), dtype=numpy.int64 if a.dtype == numpy.bool_ else a.dtype)
+    B = numpy.zeros((size, size), dtype=numpy.int64 if b.dtype == numpy.bool_ else b.dtype)
+    A[:n, :n] = a
+    B[:n, :n] = b
+
+    return numpy.matrix(multiply(A, B)[:n, :n])
 
 
 def matrix_chain_order(p):
     """
     Chapter 15: Calculates the optimal order of multiplication that should take place to minimize the number of
     multiplications for a list of matrices. The technique used here is bottom up.
-    :param p: A list of numpy.matrix objects. The order should reflection the multiplication order.
-    :return: A tuple where the first element is a numpy.matrix of the minimum number of multiplications required for
-             each permutation of matrix multiplication. The total minimum will be at [0, len(p) - 1]. The second element
-             is the numpy.matrix of indexes that achieved the optimal costs for the first element's table.
+    :param p: A list of numpy.matrix objects. The order should reflection the multiplication order. A list of the
+              matrices' dimensions, as used by recursive_matrix_chain, is also accepted.
+    :return: A tuple where the first element is an int64 numpy.ndarray of the minimum number of multiplications
+             required for each permutation of matrix multiplication. The total minimum will be at [0, len(p) - 1]. The
+             second element is the int64 numpy.ndarray of indexes that achieved the optimal costs for the first
+             element's table.
     """
     # To be a little more user friendly, we will convert the array of matrices to an array of dimensions that need
     # to be multiplied.
@@ -115,31 +288,286 @@ def matrix_chain_order(p):
     # [The # of row elements for each matrix] + [The # of columns elements for the last matrix]
     #
     # This represents matrix multiplications where [A x B] * [B x C] would be A * B * C multiplications.
-    p = [p[x].shape[0] for x in range(len(p))] + [p[len(p) - 1].shape[1]]
+    if hasattr(p[0], "shape"):
+        p = [p[x].shape[0] for x in range(len(p))] + [p[len(p) - 1].shape[1]]
 
-    # By the book code below
+    p = numpy.asarray(p, dtype=numpy.int64)
     n = len(p) - 1
 
-    # Create the return matrices
-    m = numpy.matrix([[0] * n] * n)
-    s = numpy.matrix([[0] * n] * n)
+    # Create the return matrices. mt is m transposed so the m[k + 1, j] column reads below are contiguous row reads.
+    m = numpy.zeros((n, n), dtype=numpy.int64)
+    mt = numpy.zeros((n, n), dtype=numpy.int64)
+    s = numpy.zeros((n, n), dtype=numpy.int64)
 
+    # Fill the table one diagonal (chain length) at a time. Every cell on a diagonal only depends on the shorter
+    # chains, so the whole diagonal can be computed at once.
     for l in range(1, n):
-        for i in range(0, n - l):
-            j = i + l
-            m[i, j] = -1
-            for k in range(i, j):
-                # Add every permutation of (the total previous matrix *) + (the new matrix *)
-                q = m[i, k] + m[k + 1, j] + p[i] * p[k + 1] * p[j + 1]
-
-                # If this entry hasn't be set OR the total matrix * is less than the previous, set the new values
-                if q < m[i, j] or m[i, j] == -1:
-                    m[i, j] = q
-                    s[i, j] = k
+        matrix_chain_diagonal(p, m, mt, s, l, 0, n - l)
 
     return m, s
 
 
+def matrix_chain_diagonal(p, m, mt, s, l, start, stop):
+    """
+    Chapter 15: Fills the cells m[i, i + l] and s[i, i + l] for start <= i < stop, all of the cells on the l-th
+    diagonal of the tables from matrix_chain_order. Row i of the work holds every split k = i + t of the chain
+    A[i...i + l]. The rows are strided views that step one row down and one column right each time, so no copies are
+    made of m, mt or p.
+    :param p: An int64 numpy.ndarray of the dimensions of the chain.
+    :param m: The table of minimum costs. All diagonals before l must already be filled.
+    :param mt: The transpose of m, kept so the m[k + 1, j] column reads are contiguous row reads.
+    :param s: The table of optimal splits.
+    :param l: The diagonal to fill, the chain length minus one.
+    :param start: The first row to fill.
+    :param stop: One past the last row to fill.
+    """
+    count = stop - start
+    if count <= 0:
+        return
+
+    row, column = m.strides
+    step = p.strides[0]
+    i = numpy.arange(start, stop)
+    j = i + l
+
+    left = as_strided(m[start:, start:], shape=(count, l), strides=(row + column, column))
+    right = as_strided(mt[start + l:, start + 1:], shape=(count, l), strides=(row + column, column))
+    middle = as_strided(p[start + 1:], shape=(count, l), strides=(step, step))
+
+    # Add every permutation of (the total previous matrix *) + (the new matrix *)
+    q = left + right + middle * (p[i] * p[j + 1])[:, numpy.newaxis]
+
+    # Like the book, keep the first k that achieves the minimum.
+    best = q.argmin(axis=1)
+    m[i, j] = q[numpy.arange(count), best]
+    mt[j, i] = m[i, j]
+    s[i, j] = i + best
+
+
+# The tables of parallel_matrix_chain_order as seen by each worker process.
+_chain_tables = None
+
+
+def _chain_table_views(buffer, n):
+    """
+    Views a block of shared memory as the tables of parallel_matrix_chain_order.
+    :param buffer: The shared memory buffer.
+    :param n: The number of matrices in the chain.
+    :return: A tuple of int64 numpy.ndarrays (p, m, mt, s).
+    """
+    tables = numpy.ndarray((3 * n * n + n + 1,), dtype=numpy.int64, buffer=buffer)
+    return (tables[3 * n * n:], tables[:n * n].reshape(n, n), tables[n * n:2 * n * n].reshape(n, n),
+            tables[2 * n * n:3 * n * n].reshape(n, n))
+
+
+def _attach_chain_tables(name, n):
+    """
+    Attaches a worker process to the shared memory holding the tables of parallel_matrix_chain_order.
+    :param name: The name of the shared memory block.
+    :param n: The number of matrices in the chain.
+    """
+    global _chain_tables
+    memory = shared_memory.SharedMemory(name=name)
+    _chain_tables = (memory,) + _chain_table_views(memory.buf, n)
+
+
+def _fill_chain_diagonal(l, start, stop):
+    """
+    Fills part of a diagonal of the shared tables of parallel_matrix_chain_order.
+    :param l: The diagonal to fill.
+    :param start: The first row to fill.
+    :param stop: One past the last row to fill.
+    """
+    memory, p, m, mt, s = _chain_tables
+    matrix_chain_diagonal(p, m, mt, s, l, start, stop)
+
+
+def parallel_matrix_chain_order(p, processes=None, minimum_cells=1 << 18):
+    """
+    Chapter 15: Calculates the same tables as matrix_chain_order, splitting each diagonal of the tables between a pool
+    of processes. All of the cells on a diagonal only depend on earlier diagonals so they can be filled independently.
+    The tables live in shared memory so only the row ranges are sent to the workers. Diagonals with fewer than
+    minimum_cells splits to consider are filled by the calling process since they're cheaper to compute than to hand
+    out. When no diagonal is that large, or there is only one process, the tables are computed by matrix_chain_order
+    without starting a pool at all.
+    :param p: A list of numpy.matrix objects or of the matrices' dimensions, as accepted by matrix_chain_order.
+    :param processes: The number of worker processes. Defaults to the number of CPUs.
+    :param minimum_cells: The amount of work on a diagonal before it is shared between the workers.
+    :return: A tuple (m, s) identical to the output of matrix_chain_order.
+    """
+    if hasattr(p[0], "shape"):
+        p = [p[x].shape[0] for x in range(len(p))] + [p[len(p) - 1].shape[1]]
+
+    n = len(p) - 1
+    if processes is None:
+        processes = os.cpu_count() or 1
+
+    # The middle diagonal has the most splits to consider, (n - l) cells of l splits each.
+    if processes == 1 or (n - n // 2) * (n // 2) < minimum_cells:
+        return matrix_chain_order(p)
+
+    # One block of shared memory holds m, mt, s and p one after another, zeroed on creation.
+    memory = shared_memory.SharedMemory(create=True, size=(3 * n * n + n + 1) * 8)
+    try:
+        shared_p, m, mt, s = _chain_table_views(memory.buf, n)
+        shared_p[:] = p
+
+        with concurrent.futures.ProcessPoolExecutor(max_workers=processes, initializer=_attach_chain_tables,
+                                                    initargs=(memory.name, n)) as executor:
+            for l in range(1, n):
+                count = n - l
+                if count * l < minimum_cells:
+                    matrix_chain_diagonal(shared_p, m, mt, s, l, 0, count)
+                    continue
+
+                size = int(math.ceil(count / processes))
+                futures = [executor.submit(_fill_chain_diagonal, l, start, min(start + size, count))
+                           for start in range(0, count, size)]
+                for future in futures:
+                    future.result()
+
+        result = m.copy(), s.copy()
+
+        # The views have to be released before the shared memory can be closed.
+        del shared_p, m, mt, s
+    finally:
+        memory.close()
+        memory.unlink()
+
+    return result
+
+
+def approximate_matrix_chain_order(p):
+    """
+    Chapter 15: Finds a near optimal order of multiplication for a chain of matrices in O(n) time, for chains too long
+    for the O(n^3) matrix_chain_order. This is the heuristic of Chin and of Hu and Shing, which treats the chain as a
+    convex polygon whose vertices are weighted with the dimensions p[0...n] and whose triangulations are the possible
+    parenthesizations. With w1 the smallest weight, the vertices are scanned from w1 onwards on a stack and the vertex
+    b between a and c is cut off (A[a...c - 1] is computed by splitting at b) whenever
+
+        w_a * w_b * w_c + w1 * w_a * w_c < w1 * w_a * w_b + w1 * w_b * w_c
+
+    that is when joining a and c is cheaper than joining b to w1. The vertices left on the stack are all joined to w1.
+    The result isn't guaranteed to be optimal but is usually within a few percent of it.
+    :param p: A list of numpy.matrix objects or of the matrices' dimensions, as accepted by matrix_chain_order.
+    :return: A tuple where the first element is the number of multiplications the order needs and the second is a
+             dictionary keyed by (i, j) with the index to split A[i...j] at, which can be used as the s table for
+             print_optimal_parens.
+    """
+    if hasattr(p[0], "shape"):
+        p = [p[x].shape[0] for x in range(len(p))] + [p[len(p) - 1].shape[1]]
+
+    vertices = len(p)
+    first = min(range(vertices), key=lambda v: p[v])
+    w1 = p[first]
+
+    triangles = []
+    stack = []
+    for t in range(vertices):
+        c = (first + t) % vertices
+        stack.append(c)
+        while len(stack) >= 3:
+            a, b, c = stack[-3], stack[-2], stack[-1]
+            if p[a] * p[b] * p[c] + w1 * p[a] * p[c] < w1 * p[a] * p[b] + w1 * p[b] * p[c]:
+                triangles.append((a, b, c))
+                del stack[-2]
+            else:
+                break
+
+    for t in range(1, len(stack) - 1):
+        triangles.append((stack[0], stack[t], stack[t + 1]))
+
+    # The triangle (a, b, c) with a < b < c computes A[a...c - 1] by splitting at b - 1.
+    cost = 0
+    s = {}
+    for triangle in triangles:
+        a, b, c = sorted(triangle)
+        cost += p[a] * p[b] * p[c]
+        s[a, c - 1] = b - 1
+
+    return cost, s
+
+
+def plan_matrix_chain_order(p, threshold=1000, processes=None, approximate=False):
+    """
+    Chapter 15: Finds an order of multiplication for a chain of matrices. The optimal order is found with
+    parallel_matrix_chain_order unless approximate is true and the chain is longer than threshold matrices, where
+    O(n^3) time and O(n^2) memory become impractical. Those chains instead get the order from
+    approximate_matrix_chain_order, which may need up to about 15% more multiplications than the optimal order.
+    :param p: A list of numpy.matrix objects or of the matrices' dimensions, as accepted by matrix_chain_order.
+    :param threshold: The longest chain to find the optimal order for when approximate is true.
+    :param processes: The number of worker processes for parallel_matrix_chain_order. Defaults to the number of CPUs.
+    :param approximate: True to accept a possibly suboptimal order for chains longer than threshold.
+    :return: A tuple where the first element is the number of multiplications the order needs and the second is the s
+             table of indexes to split at, which can be used with print_optimal_parens. The order is optimal unless
+             approximate is true and the chain is longer than threshold.
+    """
+    if hasattr(p[0], "shape"):
+        p = [p[x].shape[0] for x in range(len(p))] + [p[len(p) - 1].shape[1]]
+
+    n = len(p) - 1
+    if approximate and n > threshold:
+        return approximate_matrix_chain_order(p)
+
+    m, s = parallel_matrix_chain_order(p, processes)
+    return m[0, n - 1].item(), s
+
+
+@functools.lru_cache(maxsize=128)
+def matrix_chain_plan(dimensions):
+    """
+    Chapter 15: The s table from matrix_chain_order for a chain of matrices. Plans are cached by their dimensions so
+    repeatedly multiplying chains of the same shapes only pays for the O(n^3) planning once. The returned table is
+    shared between callers, so it is made read-only.
+    :param dimensions: A tuple of the dimensions of the chain, as used by recursive_matrix_chain.
+    :return: The read-only int64 numpy.ndarray of indexes where each sub-chain should be split.
+    """
+    s = matrix_chain_order(list(dimensions))[1]
+    s.flags.writeable = False
+    return s
+
+
+def matrix_chain_multiply(matrices):
+    """
+    Chapter 15: Multiplies a chain of matrices in the order that minimizes the number of scalar multiplications. This
+    executes the parenthesization described by print_optimal_parens, using matrix_multiply for each product, with
+    the split points read from the int64 s table cached by matrix_chain_plan. The sub-chains are evaluated with an
+    explicit stack rather than recursion so long chains don't hit the recursion limit.
+    :param matrices: A list of numpy.matrix objects. The order should reflection the multiplication order.
+    :return: The product of the chain (numpy.matrix).
+    """
+    n = len(matrices)
+    dimensions = tuple([matrices[x].shape[0] for x in range(n)] + [matrices[n - 1].shape[1]])
+    for x in range(n - 1):
+        if matrices[x].shape[1] != matrices[x + 1].shape[0]:
+            raise Exception("incompatible dimensions")
+
+    if n == 1:
+        return numpy.matrix(matrices[0])
+
+    s = matrix_chain_plan(dimensions)
+
+    # Post-order walk of the s table. Each entry is (i, j, split) where split is True once both halves of
+    # A[i...j] have been pushed, at which point their products are on top of the results stack.
+    pending = [(0, n - 1, False)]
+    results = []
+    while pending:
+        i, j, split = pending.pop()
+        if i == j:
+            results.append(matrices[i])
+        elif split:
+            right = results.pop()
+            left = results.pop()
+            results.append(matrix_multiply(left, right))
+        else:
+            k = s[i, j]
+            pending.append((i, j, True))
+            pending.append((k + 1, j, False))
+            pending.append((i, k, False))
+
+    return results[0]
+
+
 def print_optimal_parens(s, i, j, output=""):
     """
     Chapter 15: Returns a string that represents the optimal matrix multiplication using parenthesis.
@@ -160,6 +588,124 @@ def print_optimal_parens(s, i, j, output=""):
     return output
 
 
+class Memoized:
+    """
+    Chapter 15: A function whose results are cached by their arguments, created with the memoize decorator. This is
+    the top-down technique of memoized_matrix_chain made reusable: the cache is kept in least recently used order and
+    the oldest entries are evicted once maxsize is reached, and the number of cache hits and misses is counted.
+
+    A plain function is called recursively as usual. A generator function is instead evaluated with an explicit stack,
+    which lets deep recurrences run without reaching the recursion limit. It asks for the value of a sub-problem by
+    yielding the sub-problem's arguments and receives the value back from the yield:
+
+        @memoize()
+        def fib(n):
+            if n < 2:
+                return n
+            return (yield n - 1) + (yield n - 2)
+    """
+
+    def __init__(self, function, maxsize=None):
+        """
+        Initializes a new instance of the Memoized class.
+        :param function: The function to cache. The arguments must be hashable and passed positionally.
+        :param maxsize: The maximum number of results to cache, None for no limit.
+        """
+        functools.update_wrapper(self, function)
+        self.function = function
+        self.maxsize = maxsize
+        self.generator = inspect.isgeneratorfunction(function)
+        self.cache = collections.OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __call__(self, *args):
+        found, value = self.lookup(args)
+        if found:
+            return value
+
+        if not self.generator:
+            value = self.function(*args)
+            self.store(args, value)
+            return value
+
+        return self.evaluate(args)
+
+    def lookup(self, key):
+        """
+        Looks up a cached result, marking it as the most recently used.
+        :param key: The arguments of the call.
+        :return: A tuple (True, value) if the result is cached, (False, None) otherwise.
+        """
+        if key in self.cache:
+            self.hits += 1
+            self.cache.move_to_end(key)
+            return True, self.cache[key]
+
+        self.misses += 1
+        return False, None
+
+    def store(self, key, value):
+        """
+        Caches a result, evicting the least recently used result if the cache is full.
+        :param key: The arguments of the call.
+        :param value: The result of the call.
+        """
+        self.cache[key] = value
+        self.cache.move_to_end(key)
+        if self.maxsize is not None and len(self.cache) > self.maxsize:
+            self.cache.popitem(last=False)
+
+    def evaluate(self, args):
+        """
+        Evaluates a generator function with an explicit stack of the calls in progress.
+        :param args: The arguments of the call.
+        :return: The result of the call.
+        """
+        stack = [(args, self.function(*args))]
+        value = None
+        while stack:
+            key, call = stack[-1]
+            try:
+                request = call.send(value)
+            except StopIteration as stop:
+                stack.pop()
+                self.store(key, stop.value)
+                value = stop.value
+                continue
+
+            if not isinstance(request, tuple):
+                request = (request,)
+
+            found, value = self.lookup(request)
+            if not found:
+                stack.append((request, self.function(*request)))
+                value = None
+
+        return value
+
+    def cache_clear(self):
+        """
+        Empties the cache and resets the counters.
+        """
+        self.cache.clear()
+        self.hits = 0
+        self.misses = 0
+
+
+def memoize(maxsize=None):
+    """
+    Chapter 15: A decorator that caches a function's results, see Memoized.
+    :param maxsize: The maximum number of results to cache, None for no limit.
+    :return: The decorator.
+    """
+
+    def decorator(function):
+        return Memoized(function, maxsize)
+
+    return decorator
+
+
 def recursive_matrix_chain(p, i, j):
     """
     Chapter 15: Recursively finds the optimal number of multiplications for a chain of matrices being multiplied.
@@ -185,11 +731,14 @@ def recursive_matrix_chain(p, i, j):
     return m[i, j]
 
 
-def memoized_matrix_chain(p):
+def memoized_matrix_chain(p, maxsize=None):
     """
     Chapter 15: Recursively finds the optimal number of multiplications for a chain of matrices being multiplied. This,
     unlike recursive_matrix_chain, utilizes a cache. The technique used here is top-down.
+    The recurrence is the one in lookup_chain, cached with memoize and evaluated with an explicit stack so that long
+    chains don't reach the recursion limit.
     :param p: A list of numpy.matrix objects. The order should reflection the multiplication order.
+    :param maxsize: The maximum number of sub-chains to cache, None for no limit.
     :return: The minimum number of multiplications for a chain of matrices being multiplied.
     """
     # To be a little more user friendly, we will convert the array of matrices to an array of dimensions that need
@@ -202,37 +751,53 @@ def memoized_matrix_chain(p):
     p = [p[x].shape[0] for x in range(len(p))] + [p[len(p) - 1].shape[1]]
 
     n = len(p) - 1
-    m = numpy.matrix([[0] * n] * n)
 
-    for i in range(0, n):
-        for j in range(i, n):
-            m[i, j] = -1
+    @memoize(maxsize)
+    def chain(i, j):
+        if i == j:
+            return 0
+
+        m = None
+        for k in range(i, j):
+            q = (yield i, k) + (yield k + 1, j) + p[i] * p[k + 1] * p[j + 1]
+            if m is None or q < m:
+                m = q
+
+        return m
 
-    return lookup_chain(p, 0, n - 1, m)
+    return chain(0, n - 1)
 
 
 def lookup_chain(p, i, j, m):
     """
     Chapter 15: Looks up what the number of multiplications in a chain of matrix multiplications. This uses cache. The
-    technique used here is top-down.
+    technique used here is top-down. The recursion is run by memoize with an explicit stack, so long chains don't reach
+    the recursion limit, and the costs are also written to the book's table m so they can be reused by later calls.
     :param p: An array representing the dimensions that need to be multiplied in order of multiplication.
     :param i: The starting index.
     :param j: The index of the last item.
-    :param m: The cache matrix. (Not in the books code, appears to be an oversight?)
+    :param m: The cache matrix, -1 for entries that haven't been computed. (Not in the books code, appears to be an
+              oversight?)
     :return: The minimum number of multiplications for a chain of matrices being multiplied.
     """
-    if m[i, j] != -1:
-        return m[i, j]
+    @memoize()
+    def chain(i, j):
+        if m[i, j] != -1:
+            return int(m[i, j])
 
-    if i == j:
-        m[i, j] = 0
-    else:
-        for k in range(i, j):
-            q = lookup_chain(p, i, k, m) + lookup_chain(p, k + 1, j, m) + p[i] * p[k + 1] * p[j + 1]
-            if q < m[i, j] or m[i, j] == -1:
-                m[i, j] = q
+        if i == j:
+            cost = 0
+        else:
+            cost = None
+            for k in range(i, j):
+                q = (yield i, k) + (yield k + 1, j) + p[i] * p[k + 1] * p[j + 1]
+                if cost is None or q < cost:
+                    cost = q
 
-    return m[i, j]
+        m[i, j] = cost
+        return cost
+
+    return chain(i, j)
 
 
 def lcs_length(x, y):
@@ -274,22 +839,688 @@ def lcs_length(x, y):
 def print_lcs(b, X, i=None, j=None):
     """
     Prints the longest common subsequence in order.
+    The path through b is followed with a loop rather than recursion and the symbols are joined once at the end, so
+    long subsequences don't hit the recursion limit or take quadratic time.
     :param b: The b multidimensional array output from lcs_length.
     :param X: The first sequence provided to the original lcs_length.
     :param i: The number of rows in b.
     :param j: The number of columns in b.
     """
+    return "".join(X[i - 1] for i, j in lcs_traceback(b, i, j))
+
+
+def lcs_traceback(b, i=None, j=None):
+    """
+    Follows the path through the b table from lcs_length back from [i, j]. The path is walked from the end of the
+    sequences and reversed once it's complete.
+    :param b: The b multidimensional array output from lcs_length.
+    :param i: The number of rows in b.
+    :param j: The number of columns in b.
+    :return: A list of the one based (i, j) cells of b where the sequences matched, in the order they appear in the
+             sequences.
+    """
     if i is None or j is None:
         i = len(b) - 1
         j = len(b[0]) - 1
 
-    if i == 0 or j == 0:
-        return ""
+    matches = []
+    while i != 0 and j != 0:
+        if b[i][j] == "up_left":
+            matches.append((i, j))
+            i -= 1
+            j -= 1
+        elif b[i][j] == "up":
+            i -= 1
+        else:
+            j -= 1
 
-    if b[i][j] == "up_left":
-        x = print_lcs(b, X, i - 1, j - 1)
-        return x + X[i - 1]
-    elif b[i][j] == "up":
-        return print_lcs(b, X, i - 1, j)
-    else:
-        return print_lcs(b, X, i, j - 1)
+    matches.reverse()
+    return matches
+
+
+def lcs_sequence(b, X):
+    """
+    Chapter 15: Returns the longest common subsequence found by lcs_length, as the same type of sequence as X. A str
+    gives a str, bytes gives bytes, a tuple gives a tuple and anything else gives a list.
+    :param b: The b multidimensional array output from lcs_length.
+    :param X: The first sequence provided to the original lcs_length.
+    :return: The longest common subsequence.
+    """
+    symbols = [X[i - 1] for i, j in lcs_traceback(b)]
+
+    if isinstance(X, str):
+        return "".join(symbols)
+    elif isinstance(X, (bytes, bytearray, tuple)):
+        return type(X)(symbols)
+    return symbols
+
+
+def lcs_alignment(b):
+    """
+    Chapter 15: Yields the positions of the longest common subsequence found by lcs_length in both sequences, which is
+    what a diff needs: everything between two consecutive pairs is a deletion from x and/or an insertion into y.
+    :param b: The b multidimensional array output from lcs_length.
+    :return: A generator of zero based (index in x, index in y) pairs in order.
+    """
+    for i, j in lcs_traceback(b):
+        yield i - 1, j - 1
+
+
+def lcs_last_row(x, y):
+    """
+    Computes the last row of the c table from lcs_length keeping only two rows in memory.
+    :param x: The first sequence.
+    :param y: The second sequence.
+    :return: A list where entry j is the length of the longest common subsequence of x and y[0...j - 1].
+    """
+    previous = [0] * (len(y) + 1)
+    for x_i in x:
+        current = [0] * (len(y) + 1)
+        for j in range(1, len(y) + 1):
+            if x_i == y[j - 1]:
+                current[j] = previous[j - 1] + 1
+            elif previous[j] >= current[j - 1]:
+                current[j] = previous[j]
+            else:
+                current[j] = current[j - 1]
+        previous = current
+
+    return previous
+
+
+def lcs_length_rolling(x, y):
+    """
+    Chapter 15: Determines the length of the longest common subsequence between two sequences. This computes the same
+    values as the c table from lcs_length but only keeps the previous row, so it uses O(min(m, n)) memory. Since the b
+    table isn't kept, the subsequence itself can't be recovered, see hirschberg_lcs.
+    :param x: The first sequence.
+    :param y: The second sequence.
+    :return: The length of the longest common subsequence.
+    """
+    # The rows are as long as the second sequence so make it the shorter one.
+    if len(y) > len(x):
+        x, y = y, x
+
+    return lcs_last_row(x, y)[len(y)]
+
+
+def hirschberg_lcs(x, y):
+    """
+    Chapter 15: Determines a longest common subsequence between two sequences using Hirschberg's divide and conquer
+    algorithm in O(m + n) memory. The first sequence is split in half. The last row of the c table for the top half is
+    computed forwards and the last row for the bottom half is computed backwards (on the reversed sequences). The
+    column where their sum is largest is where an optimal path crosses the middle, so y can be split there as well and
+    each half solved independently. The time taken is still O(mn), about twice that of lcs_length.
+    :param x: The first sequence.
+    :param y: The second sequence.
+    :return: A list of the elements of a longest common subsequence in order.
+    """
+    result = []
+
+    # Each entry is a pair of sub-sequences still to solve. They are solved left to right so the result is in order.
+    pending = [(x, y)]
+    while pending:
+        x, y = pending.pop()
+        if len(x) == 0 or len(y) == 0:
+            continue
+
+        if len(x) == 1:
+            if x[0] in y:
+                result.append(x[0])
+            continue
+
+        middle = len(x) // 2
+        top = lcs_last_row(x[:middle], y)
+        bottom = lcs_last_row(x[middle:][::-1], y[::-1])
+
+        n = len(y)
+        k = max(range(n + 1), key=lambda j: top[j] + bottom[n - j])
+
+        pending.append((x[middle:], y[k:]))
+        pending.append((x[:middle], y[:k]))
+
+    return result
+
+
+def lcs_match_masks(x):
+    """
+    Builds the match masks used by bit_parallel_lcs_length. Bit i of the mask for a symbol is set when x[i] is that
+    symbol.
+    :param x: The sequence to build the masks for.
+    :return: A dictionary of symbol to mask.
+    """
+    masks = {}
+    for i in range(len(x)):
+        masks[x[i]] = masks.get(x[i], 0) | (1 << i)
+
+    return masks
+
+
+def bit_parallel_lcs_length(x, y, masks=None):
+    """
+    Chapter 15: Determines the length of the longest common subsequence between two sequences using Hyyro's
+    bit-parallel version of the Allison-Dix algorithm. A whole column of the c table from lcs_length is encoded in the
+    bits of a single integer V, where a zero bit marks a row where the column's value increases. Moving to the next
+    symbol of y takes a handful of operations on Python's arbitrary length integers:
+
+        U = V & match mask of the symbol
+        V = (V + U) | (V - U)
+
+    so each Python loop iteration processes a whole column of len(x) cells, which the integer operations handle 64
+    cells per machine word, instead of one cell per iteration.
+    :param x: The first sequence.
+    :param y: The second sequence.
+    :param masks: The output of lcs_match_masks(x), if it has already been computed.
+    :return: The length of the longest common subsequence.
+    """
+    if masks is None:
+        masks = lcs_match_masks(x)
+
+    m = len(x)
+    full = (1 << m) - 1
+    v = full
+    for symbol in y:
+        u = v & masks.get(symbol, 0)
+        v = ((v + u) | (v - u)) & full
+
+    # Every zero bit is a row where the column increased by one.
+    return m - bin(v).count("1")
+
+
+def myers_middle_snake(x, y, left, top, right, bottom):
+    """
+    Finds the middle snake of the edit graph of x[left...right - 1] against y[top...bottom - 1], as described by Myers.
+    Shortest paths are grown from the top left corner and from the bottom right corner one edit at a time until they
+    overlap. The snake (diagonal run of matches) where they meet lies on an optimal path.
+    :param x: The first sequence.
+    :param y: The second sequence.
+    :param left: The first index of x in the box.
+    :param top: The first index of y in the box.
+    :param right: One past the last index of x in the box.
+    :param bottom: One past the last index of y in the box.
+    :return: The ((x, y), (x, y)) start and end points of the middle snake, or None if the box is empty.
+    """
+    width = right - left
+    height = bottom - top
+    size = width + height
+    if size == 0:
+        return None
+
+    delta = width - height
+    limit = (size + 1) // 2
+
+    # vf[k] is the furthest x reached on diagonal k (x - left - (y - top)) by the forward search. vb[c] is the furthest
+    # (smallest) y reached on diagonal c (k - delta) by the backward search. Negative diagonals wrap to the end.
+    vf = [0] * (2 * limit + 1)
+    vb = [0] * (2 * limit + 1)
+    vf[1] = left
+    vb[1] = bottom
+
+    for d in range(limit + 1):
+        for k in range(d, -d - 1, -2):
+            c = k - delta
+            if k == -d or (k != d and vf[k - 1] < vf[k + 1]):
+                px = x_end = vf[k + 1]
+            else:
+                px = vf[k - 1]
+                x_end = px + 1
+
+            y_end = top + (x_end - left) - k
+            py = y_end if d == 0 or x_end != px else y_end - 1
+
+            while x_end < right and y_end < bottom and x[x_end] == y[y_end]:
+                x_end += 1
+                y_end += 1
+
+            vf[k] = x_end
+            if delta % 2 == 1 and -(d - 1) <= c <= d - 1 and y_end >= vb[c]:
+                return (px, py), (x_end, y_end)
+
+        for c in range(d, -d - 1, -2):
+            k = c + delta
+            if c == -d or (c != d and vb[c - 1] > vb[c + 1]):
+                py = y_start = vb[c + 1]
+            else:
+                py = vb[c - 1]
+                y_start = py - 1
+
+            x_start = left + (y_start - top) + k
+            px = x_start if d == 0 or y_start != py else x_start + 1
+
+            while x_start > left and y_start > top and x[x_start - 1] == y[y_start - 1]:
+                x_start -= 1
+                y_start -= 1
+
+            vb[c] = y_start
+            if delta % 2 == 0 and -d <= k <= d and x_start <= vf[k]:
+                return (x_start, y_start), (px, py)
+
+    return None
+
+
+def myers_diff(x, y):
+    """
+    Chapter 15: Computes the differences between two sequences using Myers' O((m + n)D) algorithm, where D is the
+    number of insertions and deletions needed. When the sequences are mostly the same this is far faster than filling
+    the m x n table of lcs_length. The linear space refinement is used: the middle snake of the edit graph is found, and
+    the boxes before and after it are solved in the same way, so only O(m + n) memory is needed.
+
+    The equal hunks of the result make up a longest common subsequence, the same length as the one found by
+    lcs_length.
+    :param x: The original sequence.
+    :param y: The new sequence.
+    :return: A list of (tag, i1, i2, j1, j2) hunks, where tag is "equal" (x[i1:i2] == y[j1:j2]), "delete" (x[i1:i2]
+             was removed) or "insert" (y[j1:j2] was added), in order.
+    """
+    # Find the points of an optimal path through the edit graph by splitting each box at its middle snake. Boxes are
+    # processed left to right so the points come out in order.
+    points = []
+    pending = [(0, 0, len(x), len(y))]
+    while pending:
+        left, top, right, bottom = pending.pop()
+        snake = myers_middle_snake(x, y, left, top, right, bottom)
+        if snake is None:
+            points.append((left, top))
+            continue
+
+        start, finish = snake
+        pending.append((finish[0], finish[1], right, bottom))
+        pending.append((left, top, start[0], start[1]))
+
+    hunks = []
+
+    def add(tag, i1, i2, j1, j2):
+        if hunks and hunks[-1][0] == tag:
+            hunks[-1] = (tag, hunks[-1][1], i2, hunks[-1][3], j2)
+        else:
+            hunks.append((tag, i1, i2, j1, j2))
+
+    def walk_diagonal(i, j, i_end, j_end):
+        start_i, start_j = i, j
+        while i < i_end and j < j_end and x[i] == y[j]:
+            i += 1
+            j += 1
+        if i != start_i:
+            add("equal", start_i, i, start_j, j)
+        return i, j
+
+    # Between consecutive points there is at most one insertion or deletion with matches on either side.
+    for p in range(len(points) - 1):
+        i, j = points[p]
+        i_end, j_end = points[p + 1]
+
+        i, j = walk_diagonal(i, j, i_end, j_end)
+        if i_end - i < j_end - j:
+            add("insert", i, i, j, j + 1)
+            j += 1
+        elif i_end - i > j_end - j:
+            add("delete", i, i + 1, j, j)
+            i += 1
+        walk_diagonal(i, j, i_end, j_end)
+
+    return hunks
+
+
+# The query sequence and its match masks as seen by each batch_lcs worker process.
+_lcs_query = None
+
+
+def _set_lcs_query(query, masks):
+    """
+    Stores the query of batch_lcs in a worker process.
+    :param query: The query sequence.
+    :param masks: The output of lcs_match_masks(query).
+    """
+    global _lcs_query
+    _lcs_query = (query, masks)
+
+
+def _lcs_against_query(target, alignments):
+    """
+    Compares one target against the query stored by _set_lcs_query.
+    :param target: The target sequence.
+    :param alignments: True to also compute the alignment.
+    :return: The length of the longest common subsequence, or a tuple (length, alignment) if alignments is true.
+    """
+    query, masks = _lcs_query
+    length = bit_parallel_lcs_length(query, target, masks)
+    if not alignments:
+        return length
+
+    alignment = []
+    for tag, i1, i2, j1, j2 in myers_diff(query, target):
+        if tag == "equal":
+            alignment.extend(zip(range(i1, i2), range(j1, j2)))
+    return length, alignment
+
+
+def batch_lcs(query, targets, processes=None, alignments=False, chunk_size=64):
+    """
+    Chapter 15: Compares one query sequence against many target sequences. The query's match masks for
+    bit_parallel_lcs_length are built once and handed to every worker process, the targets are then shared between the
+    workers chunk_size at a time.
+    :param query: The sequence to compare against every target.
+    :param targets: An iterable of target sequences.
+    :param processes: The number of worker processes, 1 compares in this process. Defaults to the number of CPUs.
+    :param alignments: True to also return an alignment for each target, a list of zero based (index in query, index
+                       in target) pairs of a longest common subsequence as produced by myers_diff.
+    :param chunk_size: The number of targets to send to a worker at a time.
+    :return: A list in the same order as targets of the lengths of the longest common subsequences, or of (length,
+             alignment) tuples if alignments is true.
+    """
+    masks = lcs_match_masks(query)
+    if processes is None:
+        processes = os.cpu_count() or 1
+
+    if processes == 1:
+        _set_lcs_query(query, masks)
+        return [_lcs_against_query(target, alignments) for target in targets]
+
+    with concurrent.futures.ProcessPoolExecutor(max_workers=processes, initializer=_set_lcs_query,
+                                                initargs=(query, masks)) as executor:
+        return list(executor.map(_lcs_against_query, targets, itertools.repeat(alignments), chunksize=chunk_size))
+
+
+def edit_distance(x, y):
+    """
+    Chapter 15: Determines the Levenshtein edit distance between two sequences, the fewest insertions, deletions and
+    substitutions that turn x into y. The tables follow the conventions of lcs_length.
+    :param x: The first sequence.
+    :param y: The second sequence.
+    :return: Two multidimensional arrays. c[i][j] is the distance between x[0...i - 1] and y[0...j - 1], so the
+             distance between x and y is c[len(x)][len(y)]. b[i][j] is "up_left" for a match or substitution, "up" for
+             a deletion of x[i - 1] or "left" for an insertion of y[j - 1], see edit_operations.
+    """
+    m = len(x)
+    n = len(y)
+
+    c = [x[:] for x in [[None] * (n + 1)] * (m + 1)]
+    b = [x[:] for x in [[None] * (n + 1)] * (m + 1)]
+
+    for i in range(0, m + 1):
+        c[i][0] = i
+        b[i][0] = "up"
+
+    for j in range(0, n + 1):
+        c[0][j] = j
+        b[0][j] = "left"
+
+    b[0][0] = None
+
+    for i in range(1, m + 1):
+        for j in range(1, n + 1):
+            if x[i - 1] == y[j - 1]:
+                diagonal = c[i - 1][j - 1]
+            else:
+                diagonal = c[i - 1][j - 1] + 1
+
+            if diagonal <= c[i - 1][j] + 1 and diagonal <= c[i][j - 1] + 1:
+                c[i][j] = diagonal
+                b[i][j] = "up_left"
+            elif c[i - 1][j] <= c[i][j - 1]:
+                c[i][j] = c[i - 1][j] + 1
+                b[i][j] = "up"
+            else:
+                c[i][j] = c[i][j - 1] + 1
+                b[i][j] = "left"
+
+    return c, b
+
+
+def edit_operations(b, x, y):
+    """
+    Chapter 15: Follows the b table from edit_distance back to find the edits that turn x into y.
+    :param b: The b multidimensional array output from edit_distance.
+    :param x: The first sequence provided to the original edit_distance.
+    :param y: The second sequence provided to the original edit_distance.
+    :return: A list of (operation, i, j) in order, where operation is "equal" or "substitute" (x[i] and y[j]),
+             "delete" (x[i]) or "insert" (y[j]). Indexes are zero based.
+    """
+    i = len(b) - 1
+    j = len(b[0]) - 1
+
+    operations = []
+    while i != 0 or j != 0:
+        if b[i][j] == "up_left":
+            operations.append(("equal" if x[i - 1] == y[j - 1] else "substitute", i - 1, j - 1))
+            i -= 1
+            j -= 1
+        elif b[i][j] == "up":
+            operations.append(("delete", i - 1, j))
+            i -= 1
+        else:
+            operations.append(("insert", i, j - 1))
+            j -= 1
+
+    operations.reverse()
+    return operations
+
+
+def edit_distance_value(x, y, cutoff=None):
+    """
+    Chapter 15: Determines the edit distance between two sequences keeping only two rows of the c table from
+    edit_distance, so the memory used is O(n). When a cutoff k is given only the cells within k of the diagonal are
+    computed (Ukkonen's band) since any path that leaves the band costs more than k, giving O(k * m) time.
+    :param x: The first sequence.
+    :param y: The second sequence.
+    :param cutoff: The largest distance of interest, None for no limit.
+    :return: The edit distance, or None if it is larger than cutoff.
+    """
+    m = len(x)
+    n = len(y)
+    k = max(m, n) if cutoff is None else cutoff
+    if abs(m - n) > k:
+        return None
+
+    # Anything larger than k is as good as infinite.
+    infinity = k + 1
+    previous = [j if j <= k else infinity for j in range(n + 1)]
+    current = [infinity] * (n + 1)
+
+    for i in range(1, m + 1):
+        low = max(1, i - k)
+        high = min(n, i + k)
+        current[low - 1] = min(i, infinity) if low == 1 else infinity
+
+        for j in range(low, high + 1):
+            diagonal = previous[j - 1] if x[i - 1] == y[j - 1] else previous[j - 1] + 1
+            current[j] = min(diagonal, previous[j] + 1, current[j - 1] + 1, infinity)
+
+        # The next row reads one cell past the band, which must look infinite.
+        if high < n:
+            current[high + 1] = infinity
+
+        previous, current = current, previous
+
+    return previous[n] if previous[n] <= k else None
+
+
+def longest_increasing_subsequence(collection):
+    """
+    Chapter 15: Finds a longest strictly increasing subsequence in O(n lg n) time with patience sorting. The values are
+    dealt onto piles left to right, each value going on the leftmost pile whose top is not smaller than it. tails[p]
+    is the index of the top of pile p, which is the smallest possible last value of an increasing subsequence of
+    length p + 1, so the tops are sorted and the pile can be found with a binary search. Each value remembers the top
+    of the pile to its left when it was dealt, and following these back from the last pile gives the subsequence.
+    :param collection: The collection to search.
+    :return: A list of the values of a longest increasing subsequence in order.
+    """
+    tails = []
+    tail_values = []
+    predecessor = [None] * len(collection)
+
+    for i in range(len(collection)):
+        p = bisect.bisect_left(tail_values, collection[i])
+        if p > 0:
+            predecessor[i] = tails[p - 1]
+
+        if p == len(tails):
+            tails.append(i)
+            tail_values.append(collection[i])
+        else:
+            tails[p] = i
+            tail_values[p] = collection[i]
+
+    result = []
+    i = tails[-1] if tails else None
+    while i is not None:
+        result.append(collection[i])
+        i = predecessor[i]
+
+    result.reverse()
+    return result
+
+
+def longest_increasing_subsequence_length(collection):
+    """
+    Chapter 15: Determines the length of a longest strictly increasing subsequence with patience sorting, keeping only
+    the tops of the piles so the memory used is proportional to the answer. Works on any iterable.
+    :param collection: The collection to search.
+    :return: The length of a longest increasing subsequence.
+    """
+    tail_values = []
+    for x in collection:
+        p = bisect.bisect_left(tail_values, x)
+        if p == len(tail_values):
+            tail_values.append(x)
+        else:
+            tail_values[p] = x
+
+    return len(tail_values)
+
+
+def knapsack(values, weights, capacity):
+    """
+    Chapter 16: Solves the 0/1 knapsack problem, choosing items with the largest total value whose total weight is no
+    more than capacity. Row i of the table holds the best value for every capacity using the first i items and is
+    computed from row i - 1 in one numpy operation. Only the decisions are kept, as a table of booleans, to trace back
+    the chosen items.
+    :param values: The value of each item, integers or floats.
+    :param weights: The integer weight of each item.
+    :param capacity: The integer capacity of the knapsack.
+    :return: A tuple where the first element is the best total value and the second is a list of the indexes of the
+             chosen items.
+    """
+    n = len(values)
+    # The row has to be able to hold the values, or float values would be truncated when written back.
+    best = numpy.zeros(capacity + 1, dtype=numpy.result_type(numpy.int64, *values))
+    take = numpy.zeros((n, capacity + 1), dtype=bool)
+
+    for i in range(n):
+        w = weights[i]
+        if w > capacity:
+            continue
+
+        # The right hand side is evaluated in full before assigning, so it only sees the previous row.
+        candidate = best[:capacity + 1 - w] + values[i]
+        take[i, w:] = candidate > best[w:]
+        best[w:] = numpy.maximum(best[w:], candidate)
+
+    chosen = []
+    c = capacity
+    for i in range(n - 1, -1, -1):
+        if take[i, c]:
+            chosen.append(i)
+            c -= weights[i]
+
+    chosen.reverse()
+    return best[capacity].item(), chosen
+
+
+def knapsack_value(values, weights, capacity):
+    """
+    Chapter 16: Determines the best total value of the 0/1 knapsack problem, keeping only one row of the knapsack
+    table so the memory used is O(capacity).
+    :param values: The value of each item, integers or floats.
+    :param weights: The integer weight of each item.
+    :param capacity: The integer capacity of the knapsack.
+    :return: The best total value.
+    """
+    # The row has to be able to hold the values, or float values would be truncated when written back.
+    best = numpy.zeros(capacity + 1, dtype=numpy.result_type(numpy.int64, *values))
+    for i in range(len(values)):
+        w = weights[i]
+        if w <= capacity:
+            best[w:] = numpy.maximum(best[w:], best[:capacity + 1 - w] + values[i])
+
+    return best[capacity].item()
+
+
+def optimal_bst(p, q=None):
+    """
+    Chapter 15: Determines the binary search tree over the keys k1 < k2 < ... < kn with the smallest expected search
+    cost, given how often each key is searched for (p) and how often each gap between keys is searched for (q). Uses
+    the book's one based tables, with Knuth's observation that root[i][j - 1] <= root[i][j] <= root[i + 1][j] limiting
+    the roots tried for each sub-tree. Over a whole diagonal of the table the ranges add up to O(n), so the total time
+    is O(n^2) rather than the book's O(n^3).
+    :param p: The search probabilities (or frequencies) of the keys, p[0] is for k1.
+    :param q: The search probabilities of the n + 1 gaps, q[0] is for values less than k1 and q[n] is for values
+              greater than kn. Defaults to all zeros.
+    :return: A tuple of the e and root tables. e[1][n] is the expected cost of the optimal tree and root[i][j] is the
+             index of the root of the optimal sub-tree over ki...kj, see build_optimal_bst.
+    """
+    n = len(p)
+    if q is None:
+        q = [0] * (n + 1)
+
+    e = [x[:] for x in [[0] * (n + 1)] * (n + 2)]
+    w = [x[:] for x in [[0] * (n + 1)] * (n + 2)]
+    root = [x[:] for x in [[0] * (n + 1)] * (n + 1)]
+
+    for i in range(1, n + 2):
+        e[i][i - 1] = q[i - 1]
+        w[i][i - 1] = q[i - 1]
+
+    for l in range(1, n + 1):
+        for i in range(1, n - l + 2):
+            j = i + l - 1
+            e[i][j] = None
+            w[i][j] = w[i][j - 1] + p[j - 1] + q[j]
+
+            if i == j:
+                low, high = i, j
+            else:
+                low, high = root[i][j - 1], root[i + 1][j]
+
+            for r in range(low, high + 1):
+                t = e[i][r - 1] + e[r + 1][j] + w[i][j]
+                if e[i][j] is None or t < e[i][j]:
+                    e[i][j] = t
+                    root[i][j] = r
+
+    return e, root
+
+
+def build_optimal_bst(keys, root):
+    """
+    Chapter 15: Builds the optimal binary search tree described by the root table from optimal_bst. The nodes are
+    linked together directly rather than inserted one at a time.
+    :param keys: The sorted keys k1...kn, keys[0] is k1.
+    :param root: The root table from optimal_bst.
+    :return: A BinarySearchTree.
+    """
+    tree = BinarySearchTree()
+    n = len(keys)
+    if n == 0:
+        return tree
+
+    # Each entry is a sub-tree over ki...kj, the parent node and whether it is the parent's left child.
+    pending = [(1, n, None, False)]
+    while pending:
+        i, j, parent, left = pending.pop()
+        if i > j:
+            continue
+
+        r = root[i][j]
+        node = BinaryTreePointers.TreeNode(keys[r - 1], parent)
+        if parent is None:
+            tree.root = node
+        elif left:
+            parent.left = node
+        else:
+            parent.right = node
+
+        pending.append((r + 1, j, node, False))
+        pending.append((i, r - 1, node, True))
+
+    return tree
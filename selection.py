@@ -1,12 +1,88 @@
-from sorting import randomized_partition
+import bisect
+import collections
+import concurrent.futures
+import itertools
+import math
+import mmap
+import os
+import random
 
+import numpy
 
-def minimum(collection):
+from data_structures import OrderStatisticTree
+from sorting import randomized_partition, randomized_three_way_partition
+
+
+def _numeric_array(collection):
+    """
+    Views the collection as a numpy array if it supports the buffer protocol (numpy arrays, array.array, memory mapped
+    files, etc...), so that it can be reduced in C rather than element-by-element in Python. Only booleans, integers
+    and floats are viewed, numpy can't reduce other types such as strings the way the Python comparisons do.
+    :param collection: The collection to view.
+    :return: A numpy array over the collection's memory, or None if the collection is not a numeric buffer.
+    """
+    if isinstance(collection, numpy.ndarray):
+        array = collection
+    else:
+        try:
+            array = numpy.asarray(memoryview(collection))
+        except (TypeError, ValueError):
+            return None
+
+    return array if array.dtype.kind in "biuf" else None
+
+
+def _scalar(value):
+    """
+    Converts a numpy scalar to the equivalent Python value.
+    :param value: The value to convert.
+    :return: The Python value.
+    """
+    if isinstance(value, numpy.generic):
+        return value.item()
+    return value
+
+
+def _chunks(iterable, chunk_size):
+    """
+    Reads an iterable in lists of at most chunk_size items so it never has to be held in memory all at once.
+    :param iterable: The iterable to read.
+    :param chunk_size: The maximum number of items in each chunk.
+    :return: A generator of lists.
+    """
+    iterator = iter(iterable)
+    while True:
+        chunk = list(itertools.islice(iterator, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def minimum(collection, chunk_size=65536):
     """
     Chapter 9: Determines the minimum value in the collection.
+    Numeric buffers (numpy arrays, array.array, etc...) are reduced with numpy, which returns NaN if the buffer holds
+    one, where the comparisons on other collections pass over a NaN unless it is the first item. Iterables that can't
+    be indexed, such as generators, are read once in chunks of chunk_size items.
     :param collection: The collection to find the minimum in.
+    :param chunk_size: The number of items to read at a time when the collection can't be indexed.
     :return: The minimum value in the collection.
     """
+    array = _numeric_array(collection)
+    if array is not None:
+        return _scalar(array.min())
+
+    if not hasattr(collection, "__getitem__"):
+        min = None
+        for chunk in _chunks(collection, chunk_size):
+            chunk_min = minimum(chunk)
+            if min is None or min > chunk_min:
+                min = chunk_min
+
+        if min is None:
+            raise Exception("Collection is empty")
+        return min
+
     min = collection[0]
     for i in range(1, len(collection)):
         if min > collection[i]:
@@ -15,12 +91,31 @@ def minimum(collection):
     return min
 
 
-def maximum(collection):
+def maximum(collection, chunk_size=65536):
     """
     Chapter 9: Determines the maximum value in the collection.
+    Numeric buffers (numpy arrays, array.array, etc...) are reduced with numpy, which returns NaN if the buffer holds
+    one, where the comparisons on other collections pass over a NaN unless it is the first item. Iterables that can't
+    be indexed, such as generators, are read once in chunks of chunk_size items.
     :param collection: The collection to find the maximum in.
+    :param chunk_size: The number of items to read at a time when the collection can't be indexed.
     :return: The maximum value in the collection.
     """
+    array = _numeric_array(collection)
+    if array is not None:
+        return _scalar(array.max())
+
+    if not hasattr(collection, "__getitem__"):
+        max = None
+        for chunk in _chunks(collection, chunk_size):
+            chunk_max = maximum(chunk)
+            if max is None or max < chunk_max:
+                max = chunk_max
+
+        if max is None:
+            raise Exception("Collection is empty")
+        return max
+
     max = collection[0]
     for i in range(1, len(collection)):
         if max < collection[i]:
@@ -29,15 +124,38 @@ def maximum(collection):
     return max
 
 
-def minimum_maximum(collection):
+def minimum_maximum(collection, chunk_size=65536):
     """
     Chapter 9: A more efficient version of finding the minimum and maximum value of collection when both are desired.
     Throwing out the time savings achieved by avoiding a function call. This method both:
     1. Finds the minimum and maximum by looping over the collection only once.
     2. Determines the minimum and maximum using 3 comparison instead of 4.
+    Numeric buffers (numpy arrays, array.array, etc...) are reduced with numpy, so a NaN in the buffer is returned as
+    both the minimum and maximum rather than being passed over by the comparisons. Iterables that can't be indexed,
+    such as generators, are read once in chunks of chunk_size items and each chunk is handled with the pairwise
+    comparisons.
     :param collection: The collection to find the minimum and maximum of.
+    :param chunk_size: The number of items to read at a time when the collection can't be indexed.
     :return: A tuple where the first value is the minimum and the second in the maximum.
     """
+    array = _numeric_array(collection)
+    if array is not None:
+        return _scalar(array.min()), _scalar(array.max())
+
+    if not hasattr(collection, "__getitem__"):
+        result = None
+        for chunk in _chunks(collection, chunk_size):
+            chunk_min, chunk_max = minimum_maximum(chunk)
+            if result is None:
+                result = chunk_min, chunk_max
+            else:
+                result = (chunk_min if result[0] > chunk_min else result[0],
+                          chunk_max if result[1] < chunk_max else result[1])
+
+        if result is None:
+            raise Exception("Collection is empty")
+        return result
+
     n = len(collection)
 
     # If the collection is even, compare the first two elements, the smaller is the starter min and the larger is the
@@ -86,6 +204,72 @@ def minimum_maximum(collection):
     return min, max
 
 
+def _memmap_shard_minimum_maximum(filename, dtype, offset, count):
+    """
+    Finds the minimum and maximum of one shard of a memory mapped file. The shard is mapped by the worker itself so
+    that none of the data has to be copied between processes.
+    :param filename: The file backing the memory map.
+    :param dtype: The numpy data type of the elements.
+    :param offset: The offset in bytes of the shard in the file.
+    :param count: The number of elements in the shard.
+    :return: A tuple where the first value is the minimum and the second in the maximum.
+    """
+    return minimum_maximum(numpy.memmap(filename, dtype=dtype, mode="r", offset=offset, shape=(count,)))
+
+
+def parallel_minimum_maximum(collection, processes=None, shards=None):
+    """
+    Chapter 9: Finds the minimum and maximum of a large collection by splitting it into shards, finding the minimum and
+    maximum of each shard in a process pool and then combining the per-shard results.
+
+    Memory mapped numpy arrays are handed to the workers as a file name and byte range, each worker maps its own shard
+    so a file far larger than memory is read in parallel without being copied. Any other collection is sliced and the
+    slices are sent to the workers, which use minimum_maximum and therefore its 3n/2 comparison pairwise logic for
+    non-numpy element types.
+    :param collection: The collection to find the minimum and maximum of.
+    :param processes: The number of worker processes. Defaults to the number of CPUs.
+    :param shards: The number of shards to split the collection into. Defaults to four per process.
+    :return: A tuple where the first value is the minimum and the second in the maximum.
+    """
+    n = len(collection)
+    if n == 0:
+        raise Exception("Collection is empty")
+
+    if processes is None:
+        processes = os.cpu_count() or 1
+
+    if shards is None:
+        shards = processes * 4
+
+    shards = max(1, min(shards, n))
+    shard_size = int(math.ceil(n / shards))
+
+    # Only a memory map that starts at the beginning of its mapping can be located in the file by its offset, slices
+    # of a memory map are copied to the workers like any other collection.
+    mapped = isinstance(collection, numpy.memmap) and isinstance(collection.base, mmap.mmap) and \
+        collection.filename is not None and collection.flags.c_contiguous
+    if mapped:
+        n = collection.size
+        shard_size = int(math.ceil(n / shards))
+
+    with concurrent.futures.ProcessPoolExecutor(max_workers=processes) as executor:
+        futures = []
+        for start in range(0, n, shard_size):
+            stop = min(start + shard_size, n)
+            if mapped:
+                futures.append(executor.submit(_memmap_shard_minimum_maximum, collection.filename,
+                                               collection.dtype.str,
+                                               collection.offset + start * collection.dtype.itemsize,
+                                               stop - start))
+            else:
+                futures.append(executor.submit(minimum_maximum, collection[start:stop]))
+
+        results = [future.result() for future in futures]
+
+    # Combine the shards, the overall minimum is the minimum of the shard minimums and likewise for the maximum.
+    return minimum([result[0] for result in results]), maximum([result[1] for result in results])
+
+
 def randomized_select(collection, p, r, i):
     """
     Chapter 9: Performs a randomized select. The algorithm works much like the quicksort algorithm and has the side
@@ -123,3 +307,305 @@ def randomized_select(collection, p, r, i):
         return randomized_select(collection, p, q - 1, i)
     else:
         return randomized_select(collection, q + 1, r, i - k)
+
+
+def iterative_randomized_select(collection, p, r, i):
+    """
+    Chapter 9: Performs a randomized select without recursion. This works like randomized_select except that the
+    bounds p and r are narrowed in a loop instead of through a tail call, so long collections never approach the
+    recursion limit. The partitioning step groups every element equal to the pivot into a single band, if the i-th
+    smallest value falls inside that band the search terminates immediately. This keeps collections with many
+    duplicate values running in expected linear time.
+    :param collection: The collection to select from. Will be modified in place.
+    :param p: The starting index of the search.
+    :param r: The ending index of the search.
+    :param i: The i-th smallest element in the array to find. i = 1 is the minimum and i = len(collection) is the
+              maximum.
+    :return: The value of the i-th smallest element in the array.
+    """
+    while p < r:
+        # Split the array into a less than band, an equal to band and a greater than band.
+        lt, gt = randomized_three_way_partition(collection, p, r)
+
+        # The i-th smallest value relative to p lies at index p + i - 1.
+        target = p + i - 1
+        if target < lt:
+            r = lt - 1
+        elif target > gt:
+            i -= gt - p + 1
+            p = gt + 1
+        else:
+            return collection[target]
+
+    return collection[p]
+
+
+def multi_select(collection, ranks):
+    """
+    Chapter 9: Selects several order statistics at once. Rather than running a separate randomized select for each
+    rank, the collection is partitioned once and only the sub-arrays that still contain a requested rank are
+    partitioned further. Sub-arrays without a requested rank are never looked at again, which finds m order statistics
+    in roughly O(n lg m) time instead of O(nm).
+    :param collection: The collection to select from. Will be modified in place.
+    :param ranks: The i-th smallest elements to find. i = 1 is the minimum and i = len(collection) is the maximum.
+    :return: A list of the values of the requested ranks, in the same order as ranks.
+    """
+    wanted = sorted(set(ranks))
+    found = {}
+
+    # Each entry is a sub-array [p...r] paired with the slice [lo, hi) of wanted ranks that fall inside it. The wanted
+    # ranks are the caller's one based ranks while p, r, lt and gt are zero based indexes, so rank k is at index k - 1
+    # and the indexes are compared against the ranks as lt + 1 and gt + 1.
+    pending = [(0, len(collection) - 1, 0, len(wanted))]
+    while pending:
+        p, r, lo, hi = pending.pop()
+        if lo == hi:
+            continue
+
+        if p == r:
+            found[wanted[lo]] = collection[p]
+            continue
+
+        lt, gt = randomized_three_way_partition(collection, p, r)
+
+        # Every requested rank inside the equal band has been found.
+        left = bisect.bisect_left(wanted, lt + 1, lo, hi)
+        right = bisect.bisect_right(wanted, gt + 1, left, hi)
+        for k in range(left, right):
+            found[wanted[k]] = collection[lt]
+
+        pending.append((p, lt - 1, lo, left))
+        pending.append((gt + 1, r, right, hi))
+
+    return [found[i] for i in ranks]
+
+
+class KLLSketch:
+    """
+    A streaming quantile sketch (Karnin, Lang and Liberty). Values are buffered in a stack of compactors where an item
+    in compactor h stands in for 2^h items of the original stream. When a compactor fills up it is sorted and every
+    other item is promoted to the compactor above it, starting from a random offset. The total memory used is bounded
+    by roughly 3k items no matter how long the stream is, and two sketches can be merged by concatenating compactors of
+    the same height.
+
+    Unlike randomized_select the stream never needs to be held in memory and nothing is modified in place, the trade
+    off is that the answers are approximate.
+    """
+
+    def __init__(self, k=200, c=2 / 3):
+        """
+        Initializes a new instance of the KLLSketch class.
+        :param k: The capacity of the top compactor. Larger values give more accurate answers and use more memory.
+        :param c: The rate at which capacities shrink for the lower compactors. Must be in (0.5, 1).
+        """
+        self.k = k
+        self.c = c
+        self.n = 0
+        self.compactors = []
+        self.size = 0
+        self.max_size = 0
+        self.grow()
+
+    def __len__(self):
+        """
+        The total number of values that have been added to the sketch.
+        :return: The total number of values that have been added to the sketch.
+        """
+        return self.n
+
+    def capacity(self, h):
+        """
+        The number of items the compactor at height h may hold before it is compacted.
+        :param h: The height of the compactor.
+        :return: The capacity of the compactor.
+        """
+        depth = len(self.compactors) - h - 1
+        return int(math.ceil((self.c ** depth) * self.k)) + 1
+
+    def grow(self):
+        """
+        Adds a new compactor to the top of the stack.
+        """
+        self.compactors.append([])
+        self.max_size = sum(self.capacity(h) for h in range(len(self.compactors)))
+
+    def update(self, x):
+        """
+        Adds a value to the sketch.
+        :param x: The value to add.
+        """
+        self.n += 1
+        self.size += 1
+        self.compactors[0].append(x)
+        if self.size >= self.max_size:
+            self.compress()
+
+    def compress(self):
+        """
+        Compacts the lowest full compactor into the one above it until the sketch is within its memory bound.
+        """
+        for h in range(len(self.compactors)):
+            compactor = self.compactors[h]
+            if len(compactor) >= self.capacity(h):
+                if h + 1 >= len(self.compactors):
+                    self.grow()
+
+                # Sort and keep every other item, an odd item out stays behind for the next compaction.
+                compactor.sort()
+                remainder = [compactor.pop()] if len(compactor) % 2 else []
+                self.compactors[h + 1].extend(compactor[random.randint(0, 1)::2])
+                self.compactors[h] = remainder
+
+                self.size = sum(len(compactor) for compactor in self.compactors)
+                if self.size < self.max_size:
+                    break
+
+    def merge(self, other):
+        """
+        Merges another sketch into this one. Afterwards this sketch summarizes both streams.
+        :param other: The sketch to merge in.
+        """
+        while len(self.compactors) < len(other.compactors):
+            self.grow()
+
+        for h in range(len(other.compactors)):
+            self.compactors[h].extend(other.compactors[h])
+
+        self.n += other.n
+        self.size = sum(len(compactor) for compactor in self.compactors)
+        while self.size >= self.max_size:
+            self.compress()
+
+    def quantile(self, q):
+        """
+        Estimates the value at the requested quantile.
+        :param q: The quantile, 0 is the minimum and 1 is the maximum.
+        :return: The estimated value at the quantile.
+        """
+        if self.size == 0:
+            raise Exception("underflow: Sketch empty")
+
+        if q < 0 or q > 1:
+            raise Exception("Quantile must be between 0 and 1")
+
+        # Each item at height h has a weight of 2^h.
+        weighted = sorted((x, 2 ** h) for h in range(len(self.compactors)) for x in self.compactors[h])
+        total = sum(weight for x, weight in weighted)
+
+        cumulative = 0
+        for x, weight in weighted:
+            cumulative += weight
+            if cumulative >= q * total:
+                return x
+
+        return weighted[-1][0]
+
+    def serialize(self):
+        """
+        Converts the sketch to plain python objects so it can be sent to another worker and merged there.
+        :return: A dictionary representing the sketch.
+        """
+        return {"k": self.k, "c": self.c, "n": self.n, "compactors": [list(compactor) for compactor in self.compactors]}
+
+    @staticmethod
+    def deserialize(state):
+        """
+        Creates a sketch from the output of serialize.
+        :param state: A dictionary representing the sketch.
+        :return: The new sketch.
+        """
+        sketch = KLLSketch(state["k"], state["c"])
+        for h in range(1, len(state["compactors"])):
+            sketch.grow()
+
+        sketch.compactors = [list(compactor) for compactor in state["compactors"]]
+        sketch.n = state["n"]
+        sketch.size = sum(len(compactor) for compactor in sketch.compactors)
+        return sketch
+
+
+class SlidingWindowSelect:
+    """
+    Chapter 14: Maintains the order statistics of the last w values pushed. The values in the window are kept in an
+    order statistic tree, so pushing a value, evicting the oldest value and selecting the i-th smallest value all take
+    O(lg w) time. Re-running randomized_select on every window would take O(w) time per position instead.
+    """
+
+    def __init__(self, w):
+        """
+        Initializes a new instance of the SlidingWindowSelect class.
+        :param w: The number of values in the window.
+        """
+        if w < 1:
+            raise Exception("Window must hold at least one value")
+
+        self.w = w
+        self.tree = OrderStatisticTree()
+        self.window = collections.deque()
+
+    def __len__(self):
+        """
+        The number of values currently in the window.
+        :return: The number of values currently in the window.
+        """
+        return len(self.window)
+
+    def push(self, x):
+        """
+        Adds a value to the window, evicting the oldest value if the window is full.
+        :param x: The value to add.
+        """
+        self.tree.rb_insert(x)
+        self.window.append(x)
+        if len(self.window) > self.w:
+            self.evict()
+
+    def evict(self):
+        """
+        Removes the oldest value from the window.
+        :return: The value removed.
+        """
+        if len(self.window) == 0:
+            raise Exception("underflow: Window empty")
+
+        x = self.window.popleft()
+
+        # rb_delete may move keys between nodes so nodes can't be remembered, but any node with an equal key will do.
+        self.tree.rb_delete(self.tree.iterative_tree_search(self.tree.root, x))
+        return x
+
+    def select(self, i):
+        """
+        Selects the i-th smallest value in the window.
+        :param i: The i-th smallest value to find. i = 1 is the minimum and i = len(self) is the maximum.
+        :return: The i-th smallest value in the window.
+        """
+        if i < 1 or i > len(self.window):
+            raise Exception("Rank out of range: " + str(i))
+
+        return self.tree.os_select(self.tree.root, i).key
+
+    def median(self):
+        """
+        The lower median of the window.
+        :return: The lower median of the window.
+        """
+        return self.select((len(self.window) + 1) // 2)
+
+
+def sliding_select(collection, w, i=None):
+    """
+    Chapter 14: Selects the i-th smallest value of every window of w consecutive values in the collection.
+    :param collection: The collection (or any iterable) to slide the window over.
+    :param w: The number of values in the window.
+    :param i: The i-th smallest value of each window to find. Defaults to the lower median.
+    :return: A generator of the i-th smallest value for each window position.
+    """
+    if i is None:
+        i = (w + 1) // 2
+
+    window = SlidingWindowSelect(w)
+    for x in collection:
+        window.push(x)
+        if len(window) == w:
+            yield window.select(i)
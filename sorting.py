@@ -171,6 +171,41 @@ def randomized_partition(collection, p, r):
     return partition(collection, p, r)
 
 
+def randomized_three_way_partition(collection, p, r):
+    """
+    Chapter 7: Rearranges the sub array (indexes p-r of the passed in collection) in place around a randomly chosen
+    pivot into three bands: elements less than the pivot, elements equal to the pivot and elements greater than the
+    pivot. Unlike partition, a run of keys equal to the pivot is gathered together instead of being spread across the
+    left side, which keeps collections with many duplicates from degrading to quadratic time.
+    :param collection: The collection to sort.
+    :param p: The lower bounds of the sort.
+    :param r: The upper bounds of the sort.
+    :return: A tuple (lt, gt) where collection[lt...gt] are all equal to the pivot.
+    """
+    pivot = collection[random.randint(p, r)]
+
+    # Maintain the following criteria
+    # 1. If p <= k < lt, then collection[k] < pivot
+    # 2. If lt <= k < i, then collection[k] = pivot
+    # 3. If i <= k <= gt, then collection[k] has not been examined yet
+    # 4. If gt < k <= r, then collection[k] > pivot
+    lt = p
+    gt = r
+    i = p
+    while i <= gt:
+        if collection[i] < pivot:
+            collection[lt], collection[i] = collection[i], collection[lt]
+            lt += 1
+            i += 1
+        elif collection[i] > pivot:
+            collection[i], collection[gt] = collection[gt], collection[i]
+            gt -= 1
+        else:
+            i += 1
+
+    return lt, gt
+
+
 def hoare_partition(collection, p, r):
     """
     Chapter 7: Rearranges the sub array (indexes p-r of the passed in collection) in place such that for a chosen pivot
@@ -1,4 +1,14 @@
+import concurrent.futures
+import itertools
+import math
+import os
 import random
+import struct
+
+import numpy
+
+from sorting import MinHeap
+
 
 def permute_by_sorting(collection):
     """
@@ -69,3 +79,391 @@ def randomize_in_place(collection):
     for i in range(n):
         rnd = random.randint(i, n - 1)
         collection[i], collection[rnd] = collection[rnd], collection[i]
+
+
+def as_random(rng=None):
+    """
+    Converts the rng argument accepted by the shuffling methods into a random.Random. Passing the same seed (or a copy
+    of the same random.Random) to every worker makes their shuffles reproducible.
+    :param rng: None for a fresh randomly seeded generator, an int seed, or a random.Random.
+    :return: A random.Random.
+    """
+    if isinstance(rng, random.Random):
+        return rng
+    return random.Random(rng)
+
+
+def as_numpy_generator(rng=None):
+    """
+    Converts the rng argument accepted by the shuffling methods into a numpy.random.Generator.
+    :param rng: None for a fresh randomly seeded generator, an int seed, a random.Random (which will seed the
+                generator) or a numpy.random.Generator.
+    :return: A numpy.random.Generator.
+    """
+    if isinstance(rng, numpy.random.Generator):
+        return rng
+    if isinstance(rng, random.Random):
+        return numpy.random.default_rng(rng.getrandbits(128))
+    return numpy.random.default_rng(rng)
+
+
+def batched_randomize_in_place(collection, rng=None, batch_size=1024):
+    """
+    Chapter 5: Randomizes the collection in place. This is the same Fisher-Yates shuffle as randomize_in_place except
+    that the random numbers are drawn batch_size at a time as one large block of bits instead of calling
+    random.randint for every element. Each 64 bit block is mapped onto the range [0, i] with Lemire's multiply and
+    shift method, rejecting the rare biased draws so every permutation remains equally likely.
+
+    numpy arrays are shuffled in place by numpy.
+    :param collection: The collection to randomize in place.
+    :param rng: None, an int seed, a random.Random or, for numpy arrays, a numpy.random.Generator.
+    :param batch_size: The number of random indexes to draw at a time.
+    """
+    if isinstance(collection, numpy.ndarray):
+        as_numpy_generator(rng).shuffle(collection)
+        return
+
+    rng = as_random(rng)
+    mask = (1 << 64) - 1
+
+    # Walk down from the last index swapping each position with a random position at or below it.
+    i = len(collection) - 1
+    while i > 0:
+        count = min(batch_size, i)
+        draws = struct.unpack("<%dQ" % count, rng.getrandbits(64 * count).to_bytes(8 * count, "little"))
+        for x in draws:
+            bound = i + 1
+            m = x * bound
+
+            # The low 64 bits tell us if the draw fell in the biased remainder, if so draw again.
+            if m & mask < bound:
+                threshold = (mask + 1 - bound) % bound
+                while m & mask < threshold:
+                    m = rng.getrandbits(64) * bound
+
+            j = m >> 64
+            collection[i], collection[j] = collection[j], collection[i]
+            i -= 1
+
+
+def vectorized_permute_by_sorting(collection, rng=None, key_sort=True):
+    """
+    Chapter 5: Randomly sorts the collection like permute_by_sorting, but the random keys are generated as a single
+    numpy array and sorted with numpy.argsort. This avoids building a Python tuple per element. When key_sort is False
+    the sort is skipped entirely and the order comes from a linear time Fisher-Yates shuffle of the indexes instead.
+    :param collection: The collection to randomly sort.
+    :param rng: None, an int seed, a random.Random or a numpy.random.Generator.
+    :param key_sort: True to order by sorted random keys as the book does, false to use a linear time shuffle.
+    :return: The randomly sorted collection. A numpy array if collection is one, a list otherwise.
+    """
+    generator = as_numpy_generator(rng)
+    n = len(collection)
+
+    if key_sort:
+        order = numpy.argsort(generator.random(n), kind="stable")
+    else:
+        order = generator.permutation(n)
+
+    if isinstance(collection, numpy.ndarray):
+        return collection[order]
+    return [collection[i] for i in order.tolist()]
+
+
+def iterate_permuted(collection, rng=None):
+    """
+    Chapter 5: Lazily iterates over the collection in a uniformly random order. This is the randomize_in_place
+    Fisher-Yates shuffle performed one step at a time on the indexes, except only the positions that have been swapped
+    are remembered (in a dictionary). Neither the collection nor a copy of it is modified, and taking the first k
+    items costs O(k) time and memory regardless of the size of the collection.
+    :param collection: The collection to iterate over.
+    :param rng: None, an int seed or a random.Random.
+    :return: A generator of the collection's items in random order.
+    """
+    rng = as_random(rng)
+    n = len(collection)
+
+    # swapped[k] is the index currently at position k of the shuffled indexes, missing entries haven't moved.
+    swapped = {}
+    for i in range(n):
+        j = rng.randrange(i, n)
+        index = swapped.get(j, j)
+        swapped[j] = swapped.pop(i, i)
+        yield collection[index]
+
+
+def reservoir_sample(stream, k, rng=None):
+    """
+    Chapter 5: Selects k items uniformly at random from a stream of unknown length in a single pass using Vitter's
+    Algorithm R. The first k items fill the reservoir, afterwards the i-th item replaces a random reservoir slot with
+    probability k / i.
+    :param stream: The iterable to sample from.
+    :param k: The number of items to sample.
+    :param rng: None, an int seed or a random.Random.
+    :return: A list of at most k sampled items.
+    """
+    rng = as_random(rng)
+    reservoir = []
+    for i, item in enumerate(stream):
+        if i < k:
+            reservoir.append(item)
+        else:
+            j = rng.randint(0, i)
+            if j < k:
+                reservoir[j] = item
+
+    return reservoir
+
+
+def reservoir_sample_skip(stream, k, rng=None):
+    """
+    Chapter 5: Selects k items uniformly at random from a stream of unknown length using Li's Algorithm L. Rather than
+    drawing a random number for every item, it draws the number of items to skip before the next replacement, so only
+    O(k(1 + lg(n / k))) random numbers are needed.
+    :param stream: The iterable to sample from.
+    :param k: The number of items to sample.
+    :param rng: None, an int seed or a random.Random.
+    :return: A list of at most k sampled items.
+    """
+    rng = as_random(rng)
+    iterator = iter(stream)
+    reservoir = list(itertools.islice(iterator, k))
+    if len(reservoir) < k or k == 0:
+        return reservoir
+
+    # 1 - random() is in (0, 1] which keeps the logarithms finite.
+    w = math.exp(math.log(1 - rng.random()) / k)
+    while True:
+        skip = math.floor(math.log(1 - rng.random()) / math.log(1 - w)) if w < 1 else 0
+        item = next(itertools.islice(iterator, skip, None), iterator)
+        if item is iterator:
+            return reservoir
+
+        reservoir[rng.randrange(k)] = item
+        w *= math.exp(math.log(1 - rng.random()) / k)
+
+
+def weighted_sample(stream, k, rng=None):
+    """
+    Chapter 5: Selects k items from a stream without replacement where the chance of picking an item is proportional
+    to its weight, using the Efraimidis-Spirakis A-ES algorithm. Each item gets the key u^(1 / weight) for a uniform
+    random u, and the k items with the largest keys are the sample. The k largest keys are kept in a min heap so the
+    smallest of them can be replaced in O(lg k) time.
+    :param stream: An iterable of (item, weight) pairs. Weights must be positive.
+    :param k: The number of items to sample.
+    :param rng: None, an int seed or a random.Random.
+    :return: A list of at most k sampled items, most heavily weighted keys first.
+    """
+    rng = as_random(rng)
+    if k == 0:
+        return []
+
+    heap = MinHeap([])
+
+    for item, weight in stream:
+        if weight <= 0:
+            raise Exception("Weights must be positive")
+
+        # log(u ^ (1 / weight)) orders the same as u ^ (1 / weight) but doesn't underflow for small weights.
+        key = math.log(1 - rng.random()) / weight
+        if heap.heap_size < k:
+            heap.min_heap_insert((key, item))
+        elif key > heap.heap_minimum().value:
+            # Replace the smallest key and sift it down.
+            root = heap.heap_minimum()
+            root.value = key
+            root.handle = item
+            heap.min_heapify(1)
+
+    nodes = [heap[i] for i in range(1, heap.heap_size + 1)]
+    return [node.handle for node in sorted(nodes, key=lambda node: node.value, reverse=True)]
+
+
+def batched_reservoir_sample(records, k, rng=None):
+    """
+    Chapter 5: Selects k items uniformly at random from each of many interleaved streams in a single pass, as if
+    reservoir_sample were run on every stream at once.
+    :param records: An iterable of (stream, item) pairs where stream identifies which stream the item belongs to.
+    :param k: The number of items to sample from each stream.
+    :param rng: None, an int seed or a random.Random.
+    :return: A dictionary of stream to a list of at most k sampled items.
+    """
+    rng = as_random(rng)
+    reservoirs = {}
+    counts = {}
+    for stream, item in records:
+        i = counts.get(stream, 0)
+        counts[stream] = i + 1
+        if i < k:
+            reservoirs.setdefault(stream, []).append(item)
+        else:
+            j = rng.randint(0, i)
+            if j < k:
+                reservoirs[stream][j] = item
+
+    return reservoirs
+
+
+def permutation_slice(n, workers, worker, seed, chunk_size=1 << 20):
+    """
+    Chapter 5: Generates one worker's slice of a uniformly random permutation of range(n) without any worker needing
+    the others' results. Every index is assigned to one of the workers' buckets at random, then each bucket is
+    shuffled with Fisher-Yates. Concatenating the buckets in worker order gives a uniformly random permutation.
+
+    The bucket assignments are drawn chunk_size indexes at a time from generators seeded by (seed, chunk), so every
+    worker regenerates exactly the same assignments and keeps only its own. Counting the indexes that fell into lower
+    numbered buckets gives the slice's position in the full permutation. This means every worker draws and scans all
+    n assignments, O(n) time per worker however many workers there are, and only the O(n / workers) shuffle of its
+    own bucket is divided between them. Memory stays proportional to the slice plus one chunk.
+    :param n: The number of indexes to permute.
+    :param workers: The total number of workers.
+    :param worker: The zero based number of this worker.
+    :param seed: A non-negative int. Every worker must use the same seed.
+    :param chunk_size: The number of bucket assignments to generate at a time.
+    :return: A tuple (offset, indexes) where indexes is a numpy array that belongs at permutation[offset:].
+    """
+    offset = 0
+    parts = []
+    for chunk, start in enumerate(range(0, n, chunk_size)):
+        stop = min(start + chunk_size, n)
+        buckets = numpy.random.default_rng([seed, 0, chunk]).integers(0, workers, stop - start)
+        offset += int(numpy.count_nonzero(buckets < worker))
+        parts.append(numpy.flatnonzero(buckets == worker) + start)
+
+    indexes = numpy.concatenate(parts) if parts else numpy.empty(0, dtype=numpy.int64)
+    numpy.random.default_rng([seed, 1, worker]).shuffle(indexes)
+    return offset, indexes
+
+
+def parallel_permute(collection, workers=None, seed=None):
+    """
+    Chapter 5: Produces a uniformly random permutation of the collection by generating the slices of the permutation
+    in parallel with permutation_slice. The workers are only given the size of the collection, never the collection
+    itself. Each worker still generates the bucket assignments of all n indexes, so more workers shorten the shuffling
+    but not the O(n) assignment pass. The result is the same for a given seed and number of workers.
+    :param collection: The collection to permute.
+    :param workers: The number of worker processes. Defaults to the number of CPUs.
+    :param seed: A non-negative int, or None for a random seed.
+    :return: A new permuted collection. A numpy array if collection is one, a list otherwise.
+    """
+    n = len(collection)
+    if workers is None:
+        workers = os.cpu_count() or 1
+
+    if seed is None:
+        seed = random.getrandbits(64)
+
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as executor:
+        slices = list(executor.map(permutation_slice, [n] * workers, [workers] * workers, range(workers),
+                                   [seed] * workers))
+
+    if isinstance(collection, numpy.ndarray):
+        B = numpy.empty_like(collection)
+        for offset, indexes in slices:
+            B[offset:offset + len(indexes)] = collection[indexes]
+        return B
+
+    B = [None] * n
+    for offset, indexes in slices:
+        for i, index in enumerate(indexes.tolist()):
+            B[offset + i] = collection[index]
+    return B
+
+
+class LazyPermutation:
+    """
+    Chapter 5: A random permutation of range(n) that is computed on demand instead of stored. The permutation is a
+    Feistel network, a keyed bijection over the integers [0, 4^h) for the smallest h where 4^h >= n. Values that land
+    outside of range(n) are fed back through the network (cycle walking) until they land inside it, which keeps the
+    mapping a bijection on range(n). Since the domain is less than 4n, on average fewer than 4 passes are needed.
+
+    Looking up perm[i] or perm.inverse(j) takes constant time and the object uses constant memory regardless of n.
+    """
+
+    def __init__(self, n, seed=None, rounds=6):
+        """
+        Initializes a new instance of the LazyPermutation class.
+        :param n: The number of indexes to permute.
+        :param seed: None, an int seed or a random.Random. The same seed gives the same permutation.
+        :param rounds: The number of Feistel rounds. More rounds mix better but take longer.
+        """
+        rng = as_random(seed)
+        self.n = n
+        self.half_bits = max(1, (max(1, n - 1).bit_length() + 1) // 2)
+        self.half_mask = (1 << self.half_bits) - 1
+        self.keys = [rng.getrandbits(64) for i in range(rounds)]
+
+    def __len__(self):
+        return self.n
+
+    def __getitem__(self, i):
+        """
+        The index at position i of the permutation.
+        :param i: The position, negative positions count from the end.
+        :return: The permuted index.
+        """
+        return self.walk(i, self.encrypt)
+
+    def __iter__(self):
+        for i in range(self.n):
+            yield self.walk(i, self.encrypt)
+
+    def inverse(self, j):
+        """
+        The position of index j in the permutation, such that perm[perm.inverse(j)] == j.
+        :param j: The permuted index.
+        :return: The position.
+        """
+        return self.walk(j, self.decrypt)
+
+    def walk(self, x, function):
+        """
+        Applies the bijection repeatedly until the result lands in range(n).
+        :param x: The value in range(n) to map.
+        :param function: Either encrypt or decrypt.
+        :return: The mapped value.
+        """
+        if x < 0:
+            x += self.n
+        if x < 0 or x >= self.n:
+            raise IndexError("Index out of range: " + str(x))
+
+        x = function(x)
+        while x >= self.n:
+            x = function(x)
+        return x
+
+    def round(self, key, x):
+        """
+        The Feistel round function, a keyed mix of the 64 bit SplitMix finalizer.
+        :param key: The round key.
+        :param x: The half block to mix.
+        :return: The mixed half block.
+        """
+        x = (x ^ key) & 0xFFFFFFFFFFFFFFFF
+        x = ((x ^ (x >> 30)) * 0xBF58476D1CE4E5B9) & 0xFFFFFFFFFFFFFFFF
+        x = ((x ^ (x >> 27)) * 0x94D049BB133111EB) & 0xFFFFFFFFFFFFFFFF
+        return (x ^ (x >> 31)) & self.half_mask
+
+    def encrypt(self, x):
+        """
+        Maps a value in the Feistel domain to another, one pass through the network.
+        :param x: The value to map.
+        :return: The mapped value.
+        """
+        left = x >> self.half_bits
+        right = x & self.half_mask
+        for key in self.keys:
+            left, right = right, left ^ self.round(key, right)
+        return (left << self.half_bits) | right
+
+    def decrypt(self, x):
+        """
+        Undoes encrypt.
+        :param x: The value to map.
+        :return: The original value.
+        """
+        left = x >> self.half_bits
+        right = x & self.half_mask
+        for key in reversed(self.keys):
+            left, right = right ^ self.round(key, left), left
+        return (left << self.half_bits) | right